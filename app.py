@@ -1,21 +1,37 @@
+import base64
+import binascii
+import copy
+import cProfile
+import hashlib
 import json
+import marshal
 import os
+import pstats
+import queue
 import random
 import re
+import socket
 import string
+import sys
+import tempfile
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from email.header import decode_header, make_header
+from email.message import EmailMessage, Message
+from email.parser import BytesFeedParser
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import IO, Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Tuple
 
 import requests
 import streamlit as st
-
-# Optional auto-refresh
-try:
-    from streamlit_autorefresh import st_autorefresh
-except Exception:
-    def st_autorefresh(*args, **kwargs):
-        return None
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # ----------------------------
 # Custom CSS Styling
@@ -187,6 +203,11 @@ def apply_custom_css():
         color: white;
     }
     
+    .badge-stale {
+        background: #f59e0b;
+        color: white;
+    }
+    
     /* Button styling */
     .stButton>button {
         border-radius: 8px;
@@ -276,12 +297,277 @@ def apply_custom_css():
     </style>
     """, unsafe_allow_html=True)
 
+# ----------------------------
+# Metrics
+# ----------------------------
+
+METRICS_PORT = int(os.environ.get("TEMPMAIL_METRICS_PORT", "0"))
+METRICS_FILE = os.environ.get("TEMPMAIL_METRICS_FILE", "")
+METRICS_FILE_INTERVAL = 10.0
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+# Process-wide counters and histograms, rendered in Prometheus text format.
+class Metrics:
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.last_run: Dict[str, float] = {}
+        self._run = threading.local()
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    def counter(self, name: str, **labels: str) -> float:
+        return sum(
+            v for (n, lbls), v in list(self.counters.items())
+            if n == name and all(dict(lbls).get(k) == val for k, val in labels.items())
+        )
+
+    def record_http(self, provider: str, endpoint: str, status: str, elapsed: float,
+                    received: int = 0, sent: int = 0):
+        self.inc("tempmail_provider_requests_total", provider=provider, endpoint=endpoint, status=status)
+        self.observe("tempmail_provider_request_seconds", elapsed, provider=provider, endpoint=endpoint)
+        self.inc("tempmail_provider_bytes_total", received, provider=provider, direction="received")
+        self.inc("tempmail_provider_bytes_total", sent, provider=provider, direction="sent")
+        if status == "429":
+            self.inc("tempmail_provider_rate_limited_total", provider=provider, endpoint=endpoint)
+        self.add_fetch(elapsed)
+
+    def add_fetch(self, elapsed: float):
+        self._run.fetch = getattr(self._run, "fetch", 0.0) + elapsed
+
+    def cache_lookup(self, cache: str, hit: bool):
+        self.inc("tempmail_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    def cache_hit_rate(self, cache: str) -> Optional[float]:
+        hits = self.counter("tempmail_cache_requests_total", cache=cache, result="hit")
+        total = hits + self.counter("tempmail_cache_requests_total", cache=cache, result="miss")
+        return hits / total if total else None
+
+    def begin_run(self):
+        self._run.started = time.perf_counter()
+        self._run.fetch = 0.0
+
+    def end_run(self):
+        started = getattr(self._run, "started", None)
+        if started is None:
+            return
+        total = time.perf_counter() - started
+        fetch = min(self._run.fetch, total)
+        self.last_run = {"total": total, "fetch": fetch, "render": total - fetch}
+        for phase, value in self.last_run.items():
+            self.observe("tempmail_rerun_seconds", value, phase=phase)
+        self._run.started = None
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda kv: kv[0])
+        lines: List[str] = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), hist in histograms:
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {hist.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {hist.total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def export_file(self, path: str):
+        # Write-then-rename so a scraping reader never sees a partial file.
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+            f.write(self.render_prometheus())
+        os.replace(f.name, path)
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in labels)
+    return "{" + body + "}"
+
+def endpoint_label(path: str) -> str:
+    return re.sub(r"^(/[\w-]+)/[^/]+", r"\1/{id}", path.split("?", 1)[0])
+
+
+@st.cache_resource
+def get_metrics() -> Metrics:
+    return Metrics()
+
+@st.cache_resource
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    metrics = get_metrics()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+# Fragment ticks never reach the end of the script, so the file is written
+# from its own thread rather than from the script tail.
+@st.cache_resource
+def start_metrics_file_exporter(path: str) -> threading.Thread:
+    metrics = get_metrics()
+
+    def loop():
+        while True:
+            time.sleep(METRICS_FILE_INTERVAL)
+            try:
+                metrics.export_file(path)
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=loop, name="metrics-file", daemon=True)
+    thread.start()
+    return thread
+
+# ----------------------------
+# MIME Source
+# ----------------------------
+
+SOURCE_CHUNK_SIZE = 64 * 1024
+
+
+class LazyPart:
+    def __init__(self, part: Message, index: int):
+        self._part = part
+        self.index = index
+        self.content_type = part.get_content_type()
+        self.filename = part.get_filename()
+        self.encoded_size = len(part.get_payload() or "")
+        self._content: Optional[bytes] = None
+
+    @property
+    def is_attachment(self) -> bool:
+        return self._part.get_content_disposition() == "attachment"
+
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = self._part.get_payload(decode=True) or b""
+        return self._content
+
+    def text(self) -> str:
+        charset = self._part.get_content_charset() or "utf-8"
+        try:
+            return self.content().decode(charset, errors="replace")
+        except LookupError:
+            return self.content().decode("utf-8", errors="replace")
+
+
+# Raw RFC 822 source, fed to the parser chunk by chunk. The compat32 policy
+# keeps headers and payloads encoded; they are decoded only when accessed.
+class LazyMimeMessage:
+    def __init__(self, message: Message, raw_size: int):
+        self._message = message
+        self.raw_size = raw_size
+        self._headers: Dict[str, List[str]] = {}
+        self._parts: Optional[List[LazyPart]] = None
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[bytes]) -> "LazyMimeMessage":
+        parser = BytesFeedParser()
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            parser.feed(chunk)
+        return cls(parser.close(), size)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "LazyMimeMessage":
+        return cls.from_chunks(raw[i:i + SOURCE_CHUNK_SIZE] for i in range(0, len(raw), SOURCE_CHUNK_SIZE))
+
+    def header_names(self) -> List[str]:
+        return list(dict.fromkeys(self._message.keys()))
+
+    def headers(self, name: str) -> List[str]:
+        key = name.lower()
+        if key not in self._headers:
+            self._headers[key] = [
+                str(make_header(decode_header(v))) if "=?" in v else " ".join(v.split())
+                for v in self._message.get_all(name, [])
+            ]
+        return self._headers[key]
+
+    def header(self, name: str) -> str:
+        values = self.headers(name)
+        return values[0] if values else ""
+
+    def as_bytes(self) -> bytes:
+        return self._message.as_bytes()
+
+    def raw_header_block(self) -> str:
+        return "\n".join(f"{k}: {v}" for k, v in self._message.items())
+
+    def parts(self) -> List[LazyPart]:
+        if self._parts is None:
+            leaves = [p for p in self._message.walk() if not p.is_multipart()]
+            self._parts = [LazyPart(p, i) for i, p in enumerate(leaves)]
+        return self._parts
+
+    def __sizeof__(self) -> int:
+        decoded = sum(len(p._content) for p in (self._parts or []) if p._content is not None)
+        return object.__sizeof__(self) + self.raw_size + decoded
+
+
 # ----------------------------
 # Provider Interfaces
 # ----------------------------
 
 class TempMailProvider:
     name: str = "base"
+    supports_delete: bool = False
 
     def generate_email(self) -> Tuple[str, Dict[str, Any]]:
         raise NotImplementedError
@@ -289,17 +575,37 @@ class TempMailProvider:
     def list_messages(self, state: Dict[str, Any]) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
+    def count_messages(self, state: Dict[str, Any]) -> int:
+        return len(self.list_messages(state))
+
     def read_message(self, state: Dict[str, Any], msg_id: str) -> Dict[str, Any]:
         raise NotImplementedError
 
+    def delete_account(self, state: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def read_source(self, state: Dict[str, Any], msg_id: str) -> LazyMimeMessage:
+        raise NotImplementedError
+
 
 class OneSecMailProvider(TempMailProvider):
     name = "1secmail"
-    API_BASE = "https://www.1secmail.com/api/v1/"
+    API_BASE = os.environ.get("TEMPMAIL_1SECMAIL_API_BASE", "https://www.1secmail.com/api/v1/")
 
     def _get(self, params: Dict[str, Any], retries: int = 1, timeout: int = 10) -> Any:
+        metrics = get_metrics()
+        endpoint = str(params.get("action", ""))
         for attempt in range(retries + 1):
-            resp = requests.get(self.API_BASE, params=params, timeout=timeout)
+            if attempt:
+                metrics.inc("tempmail_provider_retries_total", provider=self.name, endpoint=endpoint)
+            start = time.perf_counter()
+            try:
+                resp = requests.get(self.API_BASE, params=params, timeout=timeout)
+            except requests.RequestException:
+                metrics.record_http(self.name, endpoint, "error", time.perf_counter() - start)
+                raise
+            metrics.record_http(self.name, endpoint, str(resp.status_code),
+                                time.perf_counter() - start, received=len(resp.content))
             if resp.status_code == 429:
                 wait = int(resp.headers.get("Retry-After", 2)) + attempt
                 time.sleep(wait)
@@ -346,16 +652,54 @@ class OneSecMailProvider(TempMailProvider):
             "attachments": detail.get("attachments") or [],
         }
 
+    def read_source(self, state: Dict[str, Any], msg_id: str) -> LazyMimeMessage:
+        # 1secmail has no raw-source endpoint; rebuild the MIME structure from
+        # readMessage so callers get the same interface (original headers such
+        # as DKIM or Received are not available from this provider).
+        d = self.read_message(state, msg_id)
+        msg = EmailMessage()
+        msg["From"] = d["from"]
+        msg["To"] = f"{state['login']}@{state['domain']}"
+        msg["Subject"] = d["subject"]
+        try:
+            # 1secmail reports "YYYY-MM-DD HH:MM:SS" in UTC, which the header policy can't parse
+            sent = datetime.strptime(d["date"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+            msg["Date"] = format_datetime(sent)
+        except (TypeError, ValueError):
+            pass
+        msg["X-Tempmail-Reconstructed"] = "1secmail"
+        msg.set_content(d["textBody"] or "")
+        if d["htmlBody"]:
+            msg.add_alternative(d["htmlBody"], subtype="html")
+        return LazyMimeMessage.from_bytes(msg.as_bytes())
+
 
 class MailTmProvider(TempMailProvider):
     name = "Mail.tm"
-    API_BASE = "https://api.mail.tm"
+    supports_delete = True
+    API_BASE = os.environ.get("TEMPMAIL_MAILTM_API_BASE", "https://api.mail.tm")
+
+    def _send(self, method: str, path: str, headers: Dict[str, str], timeout: int, **kwargs: Any) -> requests.Response:
+        metrics = get_metrics()
+        endpoint = endpoint_label(path)
+        start = time.perf_counter()
+        try:
+            resp = requests.request(method, self.API_BASE + path, headers=headers, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            metrics.record_http(self.name, endpoint, "error", time.perf_counter() - start)
+            raise
+        sent = len(resp.request.body or b"") if resp.request is not None else 0
+        # Streamed bodies are not read here; count what the server announced.
+        received = int(resp.headers.get("Content-Length") or 0) if kwargs.get("stream") else len(resp.content)
+        metrics.record_http(self.name, endpoint, str(resp.status_code), time.perf_counter() - start,
+                            received=received, sent=sent)
+        return resp
 
     def _get(self, path: str, token: Optional[str] = None, timeout: int = 15) -> Any:
         headers = {"Accept": "application/ld+json"}
         if token:
             headers["Authorization"] = f"Bearer {token}"
-        resp = requests.get(self.API_BASE + path, headers=headers, timeout=timeout)
+        resp = self._send("GET", path, headers, timeout)
         resp.raise_for_status()
         return resp.json()
 
@@ -363,7 +707,7 @@ class MailTmProvider(TempMailProvider):
         headers = {"Accept": "application/ld+json", "Content-Type": "application/json"}
         if token:
             headers["Authorization"] = f"Bearer {token}"
-        resp = requests.post(self.API_BASE + path, headers=headers, json=payload, timeout=timeout)
+        resp = self._send("POST", path, headers, timeout, json=payload)
         resp.raise_for_status()
         return resp.json()
 
@@ -378,24 +722,56 @@ class MailTmProvider(TempMailProvider):
             raise RuntimeError("Mail.tm returned no domains.")
         return members[0].get("domain")
 
-    def _create_account_and_token(self) -> Tuple[str, str]:
-        domain = self._get_domain()
-        address = f"{self._rand_local_part()}@{domain}"
-        password = self._rand_local_part(14)
-        self._post("/accounts", {"address": address, "password": password})
+    def _login(self, address: str, password: str) -> str:
         tok = self._post("/token", {"address": address, "password": password})
         token = tok.get("token")
         if not token:
             raise RuntimeError("Mail.tm did not return a token.")
-        return address, token
+        return token
+
+    def _create_account_and_token(self) -> Tuple[str, str, str, str]:
+        domain = self._get_domain()
+        address = f"{self._rand_local_part()}@{domain}"
+        password = self._rand_local_part(14)
+        account = self._post("/accounts", {"address": address, "password": password})
+        token = self._login(address, password)
+        return address, password, token, account.get("id") or ""
+
+    def _stream(self, path: str, token: Optional[str] = None, timeout: int = 15) -> requests.Response:
+        headers = {"Accept": "message/rfc822"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        resp = self._send("GET", path, headers, timeout, stream=True)
+        if resp.status_code >= 400:
+            resp.close()
+        resp.raise_for_status()
+        return resp
+
+    def _delete(self, path: str, token: Optional[str] = None, timeout: int = 15) -> None:
+        headers = {"Accept": "application/ld+json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        resp = self._send("DELETE", path, headers, timeout)
+        if resp.status_code != 404:
+            resp.raise_for_status()
+
+    def _authed(self, call: Callable[..., Any], path: str, state: Dict[str, Any]) -> Any:
+        try:
+            return call(path, token=state["token"])
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 401 or not state.get("password"):
+                raise
+        # Expired JWT: log in again with the kept password and retry once.
+        state["token"] = self._login(state["address"], state["password"])
+        get_metrics().inc("tempmail_token_refreshes_total", provider=self.name)
+        return call(path, token=state["token"])
 
     def generate_email(self) -> Tuple[str, Dict[str, Any]]:
-        address, token = self._create_account_and_token()
-        return address, {"token": token, "address": address}
+        address, password, token, account_id = self._create_account_and_token()
+        return address, {"token": token, "address": address, "password": password, "account_id": account_id}
 
     def list_messages(self, state: Dict[str, Any]) -> List[Dict[str, Any]]:
-        token = state["token"]
-        data = self._get("/messages", token=token)
+        data = self._authed(self._get, "/messages", state)
         members = data.get("hydra:member", [])
         out = []
         for m in members:
@@ -410,9 +786,13 @@ class MailTmProvider(TempMailProvider):
         out.sort(key=lambda x: x.get("date", ""), reverse=True)
         return out
 
+    def count_messages(self, state: Dict[str, Any]) -> int:
+        # /messages is paginated; totalItems counts every page.
+        data = self._authed(self._get, "/messages", state)
+        return int(data.get("hydra:totalItems", len(data.get("hydra:member", []))))
+
     def read_message(self, state: Dict[str, Any], msg_id: str) -> Dict[str, Any]:
-        token = state["token"]
-        d = self._get(f"/messages/{msg_id}", token=token)
+        d = self._authed(self._get, f"/messages/{msg_id}", state)
         sender = d.get("from", {})
         text_body = d.get("text")
         html_body = d.get("html")
@@ -426,6 +806,122 @@ class MailTmProvider(TempMailProvider):
             "attachments": d.get("attachments") or [],
         }
 
+    def delete_account(self, state: Dict[str, Any]) -> None:
+        account_id = state.get("account_id") or self._authed(self._get, "/me", state).get("id")
+        self._authed(self._delete, f"/accounts/{account_id}", state)
+
+    def read_source(self, state: Dict[str, Any], msg_id: str) -> LazyMimeMessage:
+        # /sources/{id} wraps the same bytes in a JSON string, which has to be
+        # loaded whole; the download endpoint can be streamed into the parser.
+        resp = self._authed(self._stream, f"/messages/{msg_id}/download", state)
+        with resp:
+            return LazyMimeMessage.from_chunks(resp.iter_content(SOURCE_CHUNK_SIZE))
+
+
+# ----------------------------
+# Request Coalescing
+# ----------------------------
+
+COALESCE_WINDOW = float(os.environ.get("TEMPMAIL_COALESCE_WINDOW", "1.0"))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+# Identical concurrent calls share one upstream request and its result or
+# error; a finished result is reused for `reuse_window` seconds.
+class SingleFlight:
+    def __init__(self, reuse_window: float = COALESCE_WINDOW):
+        self.reuse_window = reuse_window
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], **labels: str) -> Any:
+        metrics = get_metrics()
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent and time.monotonic() - recent[0] <= self.reuse_window:
+                metrics.inc("tempmail_coalesced_calls_total", kind="reused", **labels)
+                return copy.copy(recent[1])
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            metrics.inc("tempmail_coalesced_calls_total", kind="inflight", **labels)
+            if flight.error is not None:
+                raise flight.error
+            return copy.copy(flight.result)
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                now = time.monotonic()
+                if flight.error is None and self.reuse_window > 0:
+                    self._recent[key] = (now, flight.result)
+                    for k in [k for k, (ts, _) in self._recent.items() if now - ts > self.reuse_window]:
+                        del self._recent[k]
+            flight.done.set()
+        metrics.inc("tempmail_coalesced_calls_total", kind="executed", **labels)
+        return copy.copy(flight.result)
+
+
+@st.cache_resource
+def get_single_flight() -> SingleFlight:
+    return SingleFlight()
+
+def mailbox_key(state: Dict[str, Any]) -> str:
+    return state.get("address") or f"{state.get('login')}@{state.get('domain')}"
+
+# Callers only share a flight when they present the same credentials;
+# otherwise anyone who knows an address could read along with its owner.
+def credential_key(state: Dict[str, Any]) -> str:
+    return hashlib.sha256(str(state.get("token") or "").encode()).hexdigest()[:16]
+
+
+class CoalescingProvider(TempMailProvider):
+    def __init__(self, inner: TempMailProvider, flight: SingleFlight):
+        self.inner = inner
+        self.flight = flight
+        self.name = inner.name
+        self.supports_delete = inner.supports_delete
+
+    def generate_email(self) -> Tuple[str, Dict[str, Any]]:
+        return self.inner.generate_email()
+
+    def list_messages(self, state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.flight.do(
+            (self.name, "list_messages", mailbox_key(state), credential_key(state)),
+            lambda: self.inner.list_messages(state),
+            provider=self.name, method="list_messages",
+        )
+
+    def read_message(self, state: Dict[str, Any], msg_id: str) -> Dict[str, Any]:
+        return self.flight.do(
+            (self.name, "read_message", mailbox_key(state), credential_key(state), msg_id),
+            lambda: self.inner.read_message(state, msg_id),
+            provider=self.name, method="read_message",
+        )
+
+    def count_messages(self, state: Dict[str, Any]) -> int:
+        return self.inner.count_messages(state)
+
+    def delete_account(self, state: Dict[str, Any]) -> None:
+        self.inner.delete_account(state)
+
+    def read_source(self, state: Dict[str, Any], msg_id: str) -> LazyMimeMessage:
+        return self.inner.read_source(state, msg_id)
+
 
 # ----------------------------
 # Helpers
@@ -443,11 +939,77 @@ def init_state():
     ss.setdefault("email", None)
     ss.setdefault("cached_messages", [])
     ss.setdefault("last_fetch_ts", 0.0)
+    ss.setdefault("inbox_fetched_ts", 0.0)
     ss.setdefault("refresh_counter", 0)
     ss.setdefault("read_messages", set())
+    ss.setdefault("message_bodies", {})
+    ss.setdefault("unloaded_bodies", set())
+    ss.setdefault("pending_fetches", {})
+    ss.setdefault("requested_fetches", set())
     ss.setdefault("search_query", "")
     ss.setdefault("connection_status", "online")
     ss.setdefault("email_created_at", None)
+    ss.setdefault("mailbox_handle", None)
+    ss.setdefault("mailbox_shared", False)
+
+def set_mailbox(provider_name: str, email: str, state: Dict[str, Any], created: bool = False):
+    discard_export()
+    get_lifecycle().acquire(current_session_id(), provider_name, email, state, created=created)
+    if created:
+        get_event_bus().watch_new(email)
+    ss = st.session_state
+    ss["provider_name"] = provider_name
+    ss["email"] = email
+    ss["provider_state"] = state
+    ss["cached_messages"] = []
+    ss["last_fetch_ts"] = 0.0
+    ss["inbox_fetched_ts"] = 0.0
+    ss["read_messages"] = set()
+    ss["message_bodies"] = {}
+    ss["unloaded_bodies"] = set()
+    ss["pending_fetches"] = {}
+    ss["email_created_at"] = datetime.now()
+    ss["mailbox_handle"] = encode_mailbox_handle(provider_name, email, state)
+    ss["mailbox_shared"] = False
+    # The handle carries credentials; it only goes in the URL when shared
+    st.query_params.pop("mailbox", None)
+
+def share_mailbox():
+    st.session_state["mailbox_shared"] = True
+    get_lifecycle().mark_shared(st.session_state["email"])
+    st.query_params["mailbox"] = st.session_state["mailbox_handle"]
+
+# on_change callback: the token is used once and cleared, so later mailbox
+# changes are not undone by a stale value in the widget.
+def resume_from_token():
+    ss = st.session_state
+    token = ss["resume_token"].strip()
+    ss["resume_token"] = ""
+    if not token or token == ss.get("mailbox_handle"):
+        return
+    try:
+        set_mailbox(*decode_mailbox_handle(token))
+    except ValueError as e:
+        ss["resume_error"] = str(e)
+
+def encode_mailbox_handle(provider_name: str, email: str, state: Dict[str, Any]) -> str:
+    payload = json.dumps({"p": provider_name, "e": email, "s": state}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_mailbox_handle(handle: str) -> Tuple[str, str, Dict[str, Any]]:
+    try:
+        raw = base64.urlsafe_b64decode(handle + "=" * (-len(handle) % 4))
+        data = json.loads(raw)
+        provider_name, email, state = data["p"], data["e"], data["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Not a valid mailbox handle.")
+    if provider_name not in PROVIDERS or not isinstance(state, dict) or not email:
+        raise ValueError("Not a valid mailbox handle.")
+    # The address is what lifecycle tracking is keyed on; it must be the one
+    # the credentials belong to.
+    if email != mailbox_key(state):
+        raise ValueError("Not a valid mailbox handle.")
+    return provider_name, email, state
 
 def throttle(seconds: float = 2.0) -> bool:
     now = time.time()
@@ -593,7 +1155,7 @@ def copy_button_html(text: str, button_id: str = "copy-btn") -> str:
     """
 
 def pick_provider(name: str) -> TempMailProvider:
-    return PROVIDERS.get(name, PROVIDERS["Mail.tm"])
+    return CoalescingProvider(PROVIDERS.get(name, PROVIDERS["Mail.tm"]), get_single_flight())
 
 def filter_messages(messages: List[Dict], query: str) -> List[Dict]:
     if not query:
@@ -605,6 +1167,974 @@ def filter_messages(messages: List[Dict], query: str) -> List[Dict]:
         or query in m.get("subject", "").lower()
     ]
 
+# ----------------------------
+# Session Memory
+# ----------------------------
+
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("TEMPMAIL_MEMORY_BUDGET_MB", "256")) * 1024 * 1024)
+SESSION_BUDGET_BYTES = int(float(os.environ.get("TEMPMAIL_SESSION_BUDGET_MB", "16")) * 1024 * 1024)
+SESSION_IDLE_SECONDS = float(os.environ.get("TEMPMAIL_SESSION_IDLE_SECONDS", "600"))
+ADMIN_TOKEN = os.environ.get("TEMPMAIL_ADMIN_TOKEN", "")
+
+def approx_size(obj: Any) -> int:
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v) for v in obj)
+    return size
+
+def is_fragment_run() -> bool:
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def current_session_id() -> str:
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else "local"
+
+def is_admin() -> bool:
+    return bool(ADMIN_TOKEN) and st.query_params.get("admin") == ADMIN_TOKEN
+
+
+class SessionUsage:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.email: Optional[str] = None
+        self.messages: List[Dict[str, Any]] = []
+        self.bodies: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[Tuple[str, ...], Future] = {}
+        # Ids of evicted bodies; cards wait for the user before refetching them.
+        self.unloaded: set = set()
+        self.read: set = set()
+        self.last_seen = time.time()
+        self.body_bytes = 0
+        self.summary_bytes = 0
+        self.pending_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self.body_bytes + self.summary_bytes + self.pending_bytes
+
+    def measure(self):
+        self.body_bytes = approx_size(self.bodies)
+        self.summary_bytes = approx_size(self.messages) + approx_size(self.read)
+        # Finished background calls hold their results until a run collects them
+        self.pending_bytes = sum(
+            approx_size(f.result()) for f in list(self.pending.values())
+            if f.done() and not f.cancelled() and f.exception() is None
+        )
+
+
+# Process-wide accounting of what each session keeps in memory. Over budget,
+# cached bodies go first (most idle sessions first), then idle summaries.
+class MemoryRegistry:
+    def __init__(self, budget: int, session_budget: int, idle_seconds: float):
+        self.budget = budget
+        self.session_budget = session_budget
+        self.idle_seconds = idle_seconds
+        self.evicted_bodies = 0
+        self.evicted_summaries = 0
+        self._sessions: Dict[str, SessionUsage] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, session_id: str, ss: Any):
+        with self._lock:
+            usage = self._sessions.get(session_id)
+            if usage is None:
+                usage = self._sessions[session_id] = SessionUsage(session_id)
+            usage.email = ss.get("email")
+            usage.messages = ss.get("cached_messages", [])
+            usage.bodies = ss.get("message_bodies", {})
+            usage.pending = ss.get("pending_fetches", {})
+            usage.unloaded = ss.get("unloaded_bodies", set())
+            usage.read = ss.get("read_messages", set())
+            usage.last_seen = time.time()
+            usage.measure()
+            self._drop_ended_sessions()
+            self._evict_bodies(usage, usage.total_bytes - self.session_budget)
+            self._enforce_global(session_id)
+
+    def total_bytes(self) -> int:
+        return sum(u.total_bytes for u in list(self._sessions.values()))
+
+    def heaviest(self, n: int = 5) -> List[SessionUsage]:
+        with self._lock:
+            return sorted(self._sessions.values(), key=lambda u: u.total_bytes, reverse=True)[:n]
+
+    def _drop_ended_sessions(self):
+        if not runtime.exists():
+            return
+        rt = runtime.get_instance()
+        for sid in [sid for sid in self._sessions if not rt.is_active_session(sid)]:
+            self._release_summaries(self._sessions.pop(sid))
+
+    def _evict_bodies(self, usage: SessionUsage, excess: int) -> int:
+        freed = 0
+        for msg_id in list(usage.bodies):
+            if freed >= excess:
+                break
+            freed += approx_size(usage.bodies.pop(msg_id, None))
+            usage.unloaded.add(msg_id)
+            self.evicted_bodies += 1
+        usage.body_bytes = max(0, usage.body_bytes - freed)
+        return freed
+
+    def _release_summaries(self, usage: SessionUsage) -> int:
+        freed = usage.total_bytes
+        self.evicted_bodies += len(usage.bodies)
+        self.evicted_summaries += len(usage.messages)
+        usage.unloaded.update(usage.bodies)
+        usage.bodies.clear()
+        usage.messages.clear()
+        usage.read.clear()
+        for key in [k for k, f in list(usage.pending.items()) if f.done()]:
+            usage.pending.pop(key, None)
+        usage.body_bytes = usage.summary_bytes = usage.pending_bytes = 0
+        return freed
+
+    def _enforce_global(self, active_session_id: str):
+        excess = self.total_bytes() - self.budget
+        if excess <= 0:
+            return
+        # The running session goes last so its own page stays intact.
+        by_idle = sorted(
+            self._sessions.values(),
+            key=lambda u: (u.session_id == active_session_id, u.last_seen),
+        )
+        for usage in by_idle:
+            if excess <= 0:
+                return
+            excess -= self._evict_bodies(usage, excess)
+        now = time.time()
+        for usage in by_idle:
+            if excess <= 0:
+                return
+            if now - usage.last_seen >= self.idle_seconds:
+                excess -= self._release_summaries(usage)
+
+
+@st.cache_resource
+def get_memory_registry() -> MemoryRegistry:
+    return MemoryRegistry(MEMORY_BUDGET_BYTES, SESSION_BUDGET_BYTES, SESSION_IDLE_SECONDS)
+
+def format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+# ----------------------------
+# Run Budget
+# ----------------------------
+
+RUN_BUDGET = float(os.environ.get("TEMPMAIL_RUN_BUDGET", "3.0"))
+BACKGROUND_WORKERS = int(os.environ.get("TEMPMAIL_BACKGROUND_WORKERS", "16"))
+SESSION_MAX_INFLIGHT = int(os.environ.get("TEMPMAIL_SESSION_MAX_INFLIGHT", "4"))
+# On inbox fragment reruns, a cached inbox younger than this is shown at once
+# and revalidated in the background; 0 always waits for the refresh (within
+# the run budget).
+MAX_STALENESS = float(os.environ.get("TEMPMAIL_MAX_STALENESS", "60"))
+# How long a revalidating fragment run waits, after rendering, for the
+# refresh to land. The script thread can't handle widget events meanwhile,
+# so this stays short; slower refreshes are applied by the next tick.
+REVALIDATE_WAIT = float(os.environ.get("TEMPMAIL_REVALIDATE_WAIT", "0.2"))
+
+# One pool per kind of call ("list", "read"), so a backlog of body reads
+# never delays inbox refreshes.
+@st.cache_resource
+def get_background_pool(kind: str) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix=f"tempmail-{kind}")
+
+def start_run_budget():
+    st.session_state["run_deadline"] = time.monotonic() + RUN_BUDGET
+
+def budget_remaining() -> float:
+    return max(0.0, st.session_state.get("run_deadline", 0.0) - time.monotonic())
+
+# Provider calls run on shared pools and are only awaited until the run's
+# deadline. A call that misses it keeps going in pending_fetches and a later
+# rerun asking for the same key picks up its result instead of starting over.
+# Keys start with the kind of call; a session may have at most
+# SESSION_MAX_INFLIGHT unfinished calls of each kind, further ones are not
+# submitted (None) until earlier ones finish.
+def submit_background(key: Tuple[str, ...], fn: Callable[[], Any]) -> Optional[Future]:
+    pending = st.session_state["pending_fetches"]
+    st.session_state["requested_fetches"].add(key)
+    future = pending.get(key)
+    if future is None:
+        kind = key[0]
+        inflight = sum(1 for k, f in pending.items() if k[0] == kind and not f.done())
+        if inflight >= SESSION_MAX_INFLIGHT:
+            return None
+        if st.session_state.get("active_profiler") is not None:
+            fn = profiled_call(fn, st.session_state["worker_profiles"])
+        future = pending[key] = get_background_pool(kind).submit(fn)
+    return future
+
+# Drops finished results of the given kinds that nothing asked for since
+# requested_fetches was last reset (cards hidden by a search, messages that
+# left the inbox); they would otherwise sit in session memory until the
+# mailbox changes.
+def prune_background(kinds: Tuple[str, ...]):
+    pending = st.session_state["pending_fetches"]
+    requested = st.session_state["requested_fetches"]
+    for key in [k for k, f in pending.items() if k[0] in kinds and f.done() and k not in requested]:
+        del pending[key]
+
+def call_within_budget(key: Tuple[str, ...], fn: Callable[[], Any], kind: str) -> Tuple[bool, Any]:
+    pending = st.session_state["pending_fetches"]
+    future = submit_background(key, fn)
+    if future is None:
+        get_metrics().inc("tempmail_budget_deferred_calls_total", kind=kind)
+        return False, None
+    started = time.perf_counter()
+    wait([future], timeout=budget_remaining())
+    get_metrics().add_fetch(time.perf_counter() - started)
+    if not future.done():
+        get_metrics().inc("tempmail_budget_deferred_calls_total", kind=kind)
+        return False, None
+    del pending[key]
+    return True, future.result()
+
+# Account creation takes several sequential calls; False while it is still
+# running in the background.
+def generate_mailbox(provider_name: str) -> bool:
+    ready, result = call_within_budget(("generate", provider_name), PROVIDERS[provider_name].generate_email,
+                                       kind="generate_email")
+    if ready:
+        set_mailbox(provider_name, *result, created=True)
+    return ready
+
+# Ticks while a deferred call of the main flow is still running and reruns
+# the app once it has finished, so its result is picked up without a click.
+def await_background(key: Tuple[str, ...]):
+    future = st.session_state["pending_fetches"].get(key)
+    if future is None or future.done():
+        st.rerun()
+
+# ----------------------------
+# Mailbox Lifecycle
+# ----------------------------
+
+MAILBOX_TTL = float(os.environ.get("TEMPMAIL_MAILBOX_TTL", str(24 * 3600)))
+CLEANUP_GRACE = float(os.environ.get("TEMPMAIL_CLEANUP_GRACE", "600"))
+CLEANUP_INTERVAL = float(os.environ.get("TEMPMAIL_CLEANUP_INTERVAL", "30"))
+CLEANUP_RATE = float(os.environ.get("TEMPMAIL_CLEANUP_RATE", "2"))
+CLEANUP_BATCH = int(os.environ.get("TEMPMAIL_CLEANUP_BATCH", "20"))
+CLEANUP_MAX_ATTEMPTS = 3
+CLEANUP_STATE_FILE = os.environ.get(
+    "TEMPMAIL_CLEANUP_STATE", os.path.join(tempfile.gettempdir(), "tempmail_mailboxes.json"))
+
+
+class TrackedMailbox:
+    def __init__(self, provider_name: str, address: str, state: Dict[str, Any]):
+        self.provider_name = provider_name
+        self.address = address
+        self.state = state
+        self.created_at = time.time()
+        self.sessions: set = set()
+        self.released_at: Optional[float] = None
+        self.attempts = 0
+        self.shared = False
+
+    def due(self, now: float, ttl: float, grace: float) -> bool:
+        # Never delete an inbox a session still has open, even past the TTL;
+        # it goes once the last session releases it.
+        if self.sessions or self.released_at is None:
+            return False
+        if ttl and now - self.created_at >= ttl:
+            return True
+        return not self.shared and now - self.released_at >= grace
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider_name, "address": self.address, "state": self.state,
+            "created_at": self.created_at, "released_at": self.released_at,
+            "attempts": self.attempts, "shared": self.shared,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrackedMailbox":
+        box = cls(data["provider"], data["address"], data["state"])
+        box.created_at = data.get("created_at", box.created_at)
+        box.released_at = data.get("released_at")
+        box.attempts = data.get("attempts", 0)
+        box.shared = data.get("shared", False)
+        return box
+
+
+# Deletes mailboxes this deployment created once no session has them open
+# any more (replaced or session ended) and the grace period or the TTL has
+# passed. The grace period covers reloads and short-lived resumes; mailboxes
+# whose handle was shared are kept until the TTL so the link keeps working. The tracked set is saved to `path` so a restart picks
+# up where the previous process left off.
+class LifecycleManager:
+    def __init__(self, providers: Dict[str, TempMailProvider], ttl: float = MAILBOX_TTL,
+                 grace: float = CLEANUP_GRACE, rate: float = CLEANUP_RATE,
+                 batch_size: int = CLEANUP_BATCH, interval: float = CLEANUP_INTERVAL,
+                 path: str = CLEANUP_STATE_FILE):
+        self.providers = providers
+        self.ttl = ttl
+        self.grace = grace
+        self.rate = rate
+        self.batch_size = batch_size
+        self.interval = interval
+        self.path = path
+        self.stats = {"accounts_deleted": 0, "messages_reclaimed": 0, "failures": 0, "abandoned": 0}
+        self._mailboxes: Dict[str, TrackedMailbox] = {}
+        self._by_session: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._last_request = 0.0
+        self._worker: Optional[threading.Thread] = None
+        self._load()
+        if self._mailboxes:
+            self._ensure_worker()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for item in data:
+            try:
+                box = TrackedMailbox.from_dict(item)
+            except (KeyError, TypeError):
+                continue
+            if box.provider_name in self.providers:
+                # Sessions of the previous process are gone; the grace period restarts now.
+                box.released_at = box.released_at or now
+                self._mailboxes[box.address] = box
+
+    def _save(self):
+        if not self.path:
+            return
+        data = [box.to_dict() for box in self._mailboxes.values()]
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+                json.dump(data, f)
+            os.replace(f.name, self.path)
+        except OSError:
+            get_metrics().inc("tempmail_cleanup_errors_total")
+
+    def acquire(self, session_id: str, provider_name: str, address: str, state: Dict[str, Any],
+                created: bool = False):
+        with self._lock:
+            self._release(session_id)
+            box = self._mailboxes.get(address)
+            if box is None:
+                if not created or not self.providers[provider_name].supports_delete:
+                    return
+                box = self._mailboxes[address] = TrackedMailbox(provider_name, address, state)
+            box.sessions.add(session_id)
+            box.released_at = None
+            self._by_session[session_id] = address
+            self._save()
+        self._ensure_worker()
+
+    def release_session(self, session_id: str):
+        with self._lock:
+            if self._release(session_id):
+                self._save()
+
+    def mark_shared(self, address: str):
+        with self._lock:
+            box = self._mailboxes.get(address)
+            if box is not None and not box.shared:
+                box.shared = True
+                self._save()
+
+    def _release(self, session_id: str) -> bool:
+        address = self._by_session.pop(session_id, None)
+        box = self._mailboxes.get(address) if address else None
+        if box is None:
+            return False
+        box.sessions.discard(session_id)
+        if not box.sessions:
+            box.released_at = time.time()
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._mailboxes)
+
+    def _drop_ended_sessions(self):
+        if not runtime.exists():
+            return
+        rt = runtime.get_instance()
+        with self._lock:
+            ended = [sid for sid in self._by_session if not rt.is_active_session(sid)]
+            released = [self._release(sid) for sid in ended]
+            if any(released):
+                self._save()
+
+    def _pace(self):
+        if self.rate <= 0:
+            return
+        wait = self._last_request + 1.0 / self.rate - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_request = time.monotonic()
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            batch = [b for b in self._mailboxes.values() if b.due(now, self.ttl, self.grace)][:self.batch_size]
+        metrics = get_metrics()
+        reclaimed = 0
+        for box in batch:
+            provider = self.providers[box.provider_name]
+            try:
+                self._pace()
+                messages = provider.count_messages(box.state)
+                self._pace()
+                provider.delete_account(box.state)
+            except Exception:
+                box.attempts += 1
+                self.stats["failures"] += 1
+                if box.attempts < CLEANUP_MAX_ATTEMPTS:
+                    with self._lock:
+                        self._save()
+                    continue
+                self.stats["abandoned"] += 1
+            else:
+                # Deleting the account removes its messages upstream as well.
+                self.stats["accounts_deleted"] += 1
+                self.stats["messages_reclaimed"] += messages
+                metrics.inc("tempmail_cleanup_reclaimed_total", provider=box.provider_name, resource="account")
+                metrics.inc("tempmail_cleanup_reclaimed_total", messages, provider=box.provider_name,
+                            resource="message")
+                reclaimed += 1
+            with self._lock:
+                self._mailboxes.pop(box.address, None)
+                for sid in [sid for sid, addr in self._by_session.items() if addr == box.address]:
+                    del self._by_session[sid]
+                self._save()
+        return reclaimed
+
+    def _ensure_worker(self):
+        if self._worker is not None or self.interval <= 0:
+            return
+        self._worker = threading.Thread(target=self._loop, name="mailbox-cleanup", daemon=True)
+        self._worker.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self._drop_ended_sessions()
+                self.run_once()
+            except Exception:
+                get_metrics().inc("tempmail_cleanup_errors_total")
+
+
+@st.cache_resource
+def get_lifecycle() -> LifecycleManager:
+    return LifecycleManager(PROVIDERS)
+
+# ----------------------------
+# Event Fan-out
+# ----------------------------
+
+EVENT_SINKS = os.environ.get("TEMPMAIL_EVENT_SINKS", "")
+EVENT_QUEUE_SIZE = int(os.environ.get("TEMPMAIL_EVENT_QUEUE_SIZE", "1000"))
+EVENT_BATCH = int(os.environ.get("TEMPMAIL_EVENT_BATCH", "50"))
+EVENT_FLUSH_INTERVAL = float(os.environ.get("TEMPMAIL_EVENT_FLUSH", "1.0"))
+EVENT_MAX_ATTEMPTS = int(os.environ.get("TEMPMAIL_EVENT_MAX_ATTEMPTS", "5"))
+EVENT_INCLUDE_BODY = os.environ.get("TEMPMAIL_EVENT_INCLUDE_BODY", "") not in ("", "0", "false")
+EVENT_SEEN_TTL = 3600.0
+
+CODE_RE = re.compile(r"\b\d{4,8}\b")
+LINK_RE = re.compile(r"https?://[^\s\"'<>)]+")
+
+def extract_data(*texts: str) -> Dict[str, List[str]]:
+    joined = "\n".join(t for t in texts if t)
+    return {
+        "codes": list(dict.fromkeys(CODE_RE.findall(joined)))[:10],
+        "links": list(dict.fromkeys(LINK_RE.findall(joined)))[:20],
+    }
+
+
+class EventSink:
+    name: str = "sink"
+
+    def deliver(self, batch: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+
+class WebhookSink(EventSink):
+    def __init__(self, url: str, timeout: int = 5):
+        self.name = url
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, batch: List[Dict[str, Any]]) -> None:
+        resp = requests.post(self.url, json={"events": batch}, timeout=self.timeout)
+        resp.raise_for_status()
+
+
+class JsonlFileSink(EventSink):
+    def __init__(self, path: str):
+        self.name = f"file:{path}"
+        self.path = path
+
+    def deliver(self, batch: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(e, default=str) + "\n" for e in batch))
+
+
+class UnixSocketSink(EventSink):
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.name = f"unix:{path}"
+        self.path = path
+        self.timeout = timeout
+
+    def deliver(self, batch: List[Dict[str, Any]]) -> None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            sock.sendall("".join(json.dumps(e, default=str) + "\n" for e in batch).encode())
+
+def parse_sinks(spec: str) -> List[EventSink]:
+    sinks: List[EventSink] = []
+    for item in (x.strip() for x in spec.split(",")):
+        if item.startswith(("http://", "https://")):
+            sinks.append(WebhookSink(item))
+        elif item.startswith("file://"):
+            sinks.append(JsonlFileSink(item[len("file://"):]))
+        elif item.startswith("unix://"):
+            sinks.append(UnixSocketSink(item[len("unix://"):]))
+        elif item:
+            raise ValueError(f"Unsupported event sink: {item}")
+    return sinks
+
+
+# Each sink drains its own bounded queue in batches, so one slow consumer
+# only ever drops its own oldest events instead of blocking the others.
+class SinkWorker:
+    def __init__(self, sink: EventSink, maxsize: int = EVENT_QUEUE_SIZE, batch_size: int = EVENT_BATCH,
+                 flush_interval: float = EVENT_FLUSH_INTERVAL, max_attempts: int = EVENT_MAX_ATTEMPTS):
+        self.sink = sink
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.stats = {"delivered": 0, "dropped": 0, "failed": 0, "retries": 0}
+        threading.Thread(target=self._loop, name=f"event-sink {sink.name}", daemon=True).start()
+
+    def offer(self, event: Dict[str, Any]):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self._count("dropped")
+                except queue.Empty:
+                    pass
+
+    def _count(self, stage: str, n: int = 1):
+        self.stats[stage] += n
+        get_metrics().inc("tempmail_events_total", n, sink=self.sink.name, stage=stage)
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            for attempt in range(self.max_attempts):
+                try:
+                    self.sink.deliver(batch)
+                    self._count("delivered", len(batch))
+                    break
+                except Exception:
+                    if attempt + 1 < self.max_attempts:
+                        self._count("retries")
+                        time.sleep(min(30.0, 0.5 * 2 ** attempt))
+            else:
+                self._count("failed", len(batch))
+
+
+class EventBus:
+    def __init__(self, sinks: List[EventSink], include_body: bool = EVENT_INCLUDE_BODY,
+                 maxsize: int = EVENT_QUEUE_SIZE):
+        self.include_body = include_body
+        self.workers = [SinkWorker(sink, maxsize=maxsize) for sink in sinks]
+        self.published = 0
+        self.dropped = 0
+        self._seen: Dict[str, Tuple[float, set]] = {}
+        self._pending: "queue.Queue[Tuple[Dict[str, Any], TempMailProvider, Dict[str, Any]]]" = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        if self.workers:
+            threading.Thread(target=self._dispatch, name="event-dispatch", daemon=True).start()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.workers)
+
+    # A mailbox created here starts out empty, so everything in it is new.
+    def watch_new(self, mailbox: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._seen[mailbox] = (time.time(), set())
+
+    # The first sync of any other mailbox (resumed, reloaded after a restart or
+    # idle past EVENT_SEEN_TTL) only records what is there; replaying its
+    # history would hand consumers duplicates.
+    def sync(self, provider: TempMailProvider, state: Dict[str, Any], mailbox: str,
+             messages: List[Dict[str, Any]]):
+        if not self.enabled:
+            return
+        ids = {str(m.get("id")) for m in messages}
+        now = time.time()
+        with self._lock:
+            known = self._seen.get(mailbox)
+            fresh = [m for m in messages if str(m.get("id")) not in known[1]] if known else []
+            self._seen[mailbox] = (now, ids)
+            for key in [k for k, (ts, _) in self._seen.items() if now - ts > EVENT_SEEN_TTL]:
+                del self._seen[key]
+        for m in reversed(fresh):
+            self.publish({
+                "type": "message.received",
+                "id": uuid.uuid4().hex,
+                "occurred_at": datetime.now(timezone.utc).isoformat(),
+                "provider": provider.name,
+                "mailbox": mailbox,
+                "message": dict(m),
+            }, provider, state)
+
+    def publish(self, event: Dict[str, Any], provider: TempMailProvider, state: Dict[str, Any]):
+        try:
+            self._pending.put_nowait((event, provider, state))
+            self.published += 1
+            get_metrics().inc("tempmail_events_total", sink="bus", stage="published")
+        except queue.Full:
+            self.dropped += 1
+            get_metrics().inc("tempmail_events_total", sink="bus", stage="dropped")
+
+    def _dispatch(self):
+        while True:
+            event, provider, state = self._pending.get()
+            msg = event["message"]
+            body: Dict[str, Any] = {}
+            if self.include_body:
+                try:
+                    body = provider.read_message(state, str(msg.get("id")))
+                    event["body"] = {"text": body.get("textBody", ""), "html": body.get("htmlBody", "")}
+                except Exception as e:
+                    event["body_error"] = str(e)
+            event["extracted"] = extract_data(msg.get("subject", ""), body.get("textBody", ""))
+            for worker in self.workers:
+                worker.offer(event)
+
+
+@st.cache_resource
+def get_event_bus() -> EventBus:
+    return EventBus(parse_sinks(EVENT_SINKS))
+
+# ----------------------------
+# Export
+# ----------------------------
+
+EXPORT_CONCURRENCY = int(os.environ.get("TEMPMAIL_EXPORT_CONCURRENCY", "4"))
+EXPORT_TTL = float(os.environ.get("TEMPMAIL_EXPORT_TTL", "3600"))
+# Finished exports are served from disk by Streamlit's static file route
+# (server.enableStaticServing) so they never pass through session memory.
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "exports")
+EXPORT_URL = "app/static/exports"
+# The static route answers 404 for larger files (MAX_APP_STATIC_FILE_SIZE).
+EXPORT_MAX_BYTES = 200 * 1024 * 1024
+EXPORT_FORMATS = {
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "mbox": ("mbox", "application/mbox"),
+    "EML (zip)": ("zip", "application/zip"),
+}
+
+
+class JsonlExportWriter:
+    needs_source = False
+
+    def __init__(self, out: IO[bytes]):
+        self.out = out
+
+    def write(self, mailbox: str, provider_name: str, summary: Dict[str, Any], item: Any):
+        record = {"mailbox": mailbox, "provider": provider_name, **summary,
+                  "textBody": item.get("textBody", ""), "htmlBody": item.get("htmlBody", ""),
+                  "attachments": item.get("attachments", [])}
+        self.out.write((json.dumps(record, default=str) + "\n").encode())
+
+    def close(self):
+        pass
+
+
+class MboxExportWriter:
+    needs_source = True
+
+    def __init__(self, out: IO[bytes]):
+        self.out = out
+
+    def write(self, mailbox: str, provider_name: str, summary: Dict[str, Any], item: Any):
+        try:
+            when = parsedate_to_datetime(item.header("Date"))
+        except (TypeError, ValueError):
+            when = datetime.now(timezone.utc)
+        sender = (summary.get("from") or "MAILER-DAEMON").split()[0]
+        self.out.write(f"From {sender} {when.strftime('%a %b %d %H:%M:%S %Y')}\n".encode())
+        for line in item.as_bytes().splitlines(keepends=True):
+            if line.lstrip(b">").startswith(b"From "):
+                line = b">" + line
+            self.out.write(line)
+        self.out.write(b"\n\n")
+
+    def close(self):
+        pass
+
+
+class EmlZipExportWriter:
+    needs_source = True
+
+    def __init__(self, out: IO[bytes]):
+        self.zip = zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED)
+        self.count = 0
+
+    def write(self, mailbox: str, provider_name: str, summary: Dict[str, Any], item: Any):
+        self.count += 1
+        safe_id = re.sub(r"[^\w.-]", "_", str(summary.get("id")))
+        self.zip.writestr(f"{mailbox}/{self.count:05d}-{safe_id}.eml", item.as_bytes())
+
+    def close(self):
+        self.zip.close()
+
+
+EXPORT_WRITERS = {"jsonl": JsonlExportWriter, "mbox": MboxExportWriter, "zip": EmlZipExportWriter}
+
+
+# Streams one or more mailboxes to `out`. Bodies are fetched by a small
+# pool with at most `concurrency` in flight and written in inbox order as
+# they arrive, so memory stays flat regardless of inbox size. Messages that
+# fail to download are skipped and counted; returns how many were written.
+def export_mailboxes(mailboxes: List[Tuple[TempMailProvider, str, Dict[str, Any]]], fmt: str, out: IO[bytes],
+                     cached_bodies: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     concurrency: int = EXPORT_CONCURRENCY) -> int:
+    writer = EXPORT_WRITERS[fmt](out)
+    cached_bodies = cached_bodies or {}
+    listings = [(p, address, state, p.list_messages(state)) for p, address, state in mailboxes]
+    total = sum(len(msgs) for *_, msgs in listings)
+    done = written = 0
+
+    def fetch(p: TempMailProvider, address: str, state: Dict[str, Any], msg_id: str) -> Any:
+        body = cached_bodies.get(address, {}).get(msg_id)
+        if writer.needs_source:
+            if body is not None and body.get("source") is not None:
+                return body["source"]
+            return p.read_source(state, msg_id)
+        return body if body is not None else p.read_message(state, msg_id)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="export") as pool:
+        window: Deque[Tuple[str, str, Dict[str, Any], Future]] = deque()
+        for p, address, state, msgs in listings:
+            for m in msgs:
+                window.append((address, p.name, m, pool.submit(fetch, p, address, state, str(m.get("id")))))
+                if len(window) >= concurrency:
+                    written += _drain_one(writer, window)
+                    done += 1
+                    if progress:
+                        progress(done, total)
+        while window:
+            written += _drain_one(writer, window)
+            done += 1
+            if progress:
+                progress(done, total)
+    writer.close()
+    return written
+
+def _drain_one(writer: Any, window: Deque[Tuple[str, str, Dict[str, Any], Future]]) -> bool:
+    address, provider_name, summary, future = window.popleft()
+    try:
+        item = future.result()
+    except Exception:
+        get_metrics().inc("tempmail_export_failures_total", provider=provider_name)
+        return False
+    writer.write(address, provider_name, summary, item)
+    return True
+
+def mailbox_from_handle(handle: str) -> Tuple[TempMailProvider, str, Dict[str, Any]]:
+    provider_name, address, state = decode_mailbox_handle(handle)
+    return pick_provider(provider_name), address, state
+
+def sweep_exports(max_age: float = EXPORT_TTL) -> int:
+    removed = 0
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(EXPORT_DIR))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+# Files of ended sessions are only reachable through this sweep.
+@st.cache_resource
+def start_export_sweeper(interval: float = 300.0) -> threading.Thread:
+    def loop():
+        while True:
+            sweep_exports()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="export-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+def discard_export():
+    export = st.session_state.pop("export_file", None)
+    if export and os.path.exists(export["path"]):
+        os.remove(export["path"])
+
+def export_handles(handles: List[str], fmt: str, out: IO[bytes], **kwargs: Any) -> int:
+    return export_mailboxes([mailbox_from_handle(h) for h in handles], fmt, out, **kwargs)
+
+# ----------------------------
+# Profiler
+# ----------------------------
+
+PROFILE_TOP_N = 15
+PROFILE_TREE_DEPTH = 5
+PROFILE_TREE_MIN_SHARE = 0.02
+
+def func_label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+# Admins can profile the next full run (sidebar) or every run (?profile=1).
+# Without either, this is one dict lookup per run.
+def start_profiling() -> Optional[cProfile.Profile]:
+    ss = st.session_state
+    stale = ss.pop("active_profiler", None)
+    if stale is not None:
+        # A run that ended in st.rerun() never reached finish_profiling.
+        stale.disable()
+    armed = ss.pop("profile_next_run", False)
+    if not (armed or st.query_params.get("profile") == "1") or not is_admin():
+        return None
+    profiler = cProfile.Profile()
+    ss["active_profiler"] = profiler
+    ss["worker_profiles"] = []
+    profiler.enable()
+    return profiler
+
+# cProfile only sees the thread that enabled it, and provider calls run on
+# the background pools. Calls submitted during a profiled run carry their
+# own profiler and hand it back when done; calls still running when the run
+# ends are left out.
+def profiled_call(fn: Callable[[], Any], profiles: List[cProfile.Profile]) -> Callable[[], Any]:
+    def run() -> Any:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process
+            return fn()
+        try:
+            return fn()
+        finally:
+            profiler.disable()
+            profiles.append(profiler)
+    return run
+
+def finish_profiling(profiler: cProfile.Profile) -> Dict[str, Any]:
+    profiler.disable()
+    st.session_state.pop("active_profiler", None)
+    workers = list(st.session_state.pop("worker_profiles", []))
+    profiler.create_stats()
+    stats = pstats.Stats(profiler)
+    background = pstats.Stats(*workers) if workers else None
+    combined = pstats.Stats(profiler, *workers)
+    rows = sorted(combined.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:PROFILE_TOP_N]
+    tree = profile_call_tree(stats, "script run")
+    if background is not None:
+        tree += "\n\n" + profile_call_tree(background, f"background calls ({len(workers)})")
+    profile = {
+        "taken_at": datetime.now(),
+        "total": stats.total_tt,
+        "background_total": background.total_tt if background is not None else 0.0,
+        "top": [
+            {"function": func_label(func), "calls": nc, "self_ms": tt * 1000, "cumulative_ms": ct * 1000}
+            for func, (cc, nc, tt, ct, _) in rows
+        ],
+        "tree": tree,
+        "raw": marshal.dumps(combined.stats),
+    }
+    st.session_state["last_profile"] = profile
+    return profile
+
+def profile_call_tree(stats: pstats.Stats, label: str) -> str:
+    stats.calc_callees()
+    # The script's own frame (or a pool thread's wrapper) was entered before
+    # profiling started, so the functions it called directly show up as
+    # entries without callers.
+    roots = [f for f, (_, _, _, _, callers) in stats.stats.items() if not callers]
+    roots.sort(key=lambda f: stats.stats[f][3], reverse=True)
+    total = sum(stats.stats[f][3] for f in roots) or 1e-9
+    lines = [f"{total * 1000:8.1f} ms {1:6.1%}  {label}"]
+
+    def walk(func: Tuple[str, int, str], cumulative: float, depth: int, path: set):
+        lines.append(f"{'  ' * depth}{cumulative * 1000:8.1f} ms {cumulative / total:6.1%}  {func_label(func)}")
+        if depth >= PROFILE_TREE_DEPTH:
+            return
+        callees = stats.all_callees.get(func, {})
+        ranked = sorted(callees.items(), key=lambda kv: kv[1][3], reverse=True)
+        for callee, (_, _, _, ct) in ranked:
+            if ct < total * PROFILE_TREE_MIN_SHARE or callee in path:
+                continue
+            walk(callee, ct, depth + 1, path | {callee})
+
+    for root in roots:
+        if stats.stats[root][3] >= total * PROFILE_TREE_MIN_SHARE:
+            walk(root, stats.stats[root][3], 1, {root})
+    return "\n".join(lines)
+
+def render_profile(profile: Dict[str, Any]):
+    background = profile.get("background_total", 0.0)
+    st.caption(
+        f"Run profiled at {profile['taken_at']:%H:%M:%S} · {profile['total'] * 1000:.0f} ms self time"
+        + (f" · {background * 1000:.0f} ms in background calls" if background else "")
+    )
+    st.dataframe(profile["top"], hide_index=True, use_container_width=True)
+    st.code(profile["tree"], language=None)
+    st.download_button(
+        "⬇️ Raw profile (.prof)",
+        profile["raw"],
+        file_name=f"tempmail-{profile['taken_at']:%Y%m%d-%H%M%S}.prof",
+        mime="application/octet-stream",
+        key="profile_download",
+    )
+
 # ----------------------------
 # UI Components
 # ----------------------------
@@ -704,12 +2234,31 @@ def render_message_card(msg: Dict, provider: TempMailProvider, state: Dict):
         
         st.divider()
         
-        with st.spinner("Loading message..."):
-            try:
-                d = provider.read_message(state, msg_id)
-            except Exception as e:
-                st.error(f"❌ Failed to load message: {e}")
+        bodies = st.session_state["message_bodies"]
+        d = bodies.get(msg_id)
+        get_metrics().cache_lookup("body", d is not None)
+        unloaded = st.session_state["unloaded_bodies"]
+        if d is None and msg_id in unloaded:
+            # Evicted to stay within the memory budget; refetch only on request
+            if not st.button("📄 Load message", key=f"load_body_{msg_id}"):
+                st.caption("Message body was unloaded to save memory.")
                 return
+            unloaded.discard(msg_id)
+        if d is None:
+            with st.spinner("Loading message..."):
+                try:
+                    ready, d = call_within_budget(
+                        ("read", mailbox_key(state), msg_id),
+                        lambda: provider.read_message(state, msg_id),
+                        kind="read_message",
+                    )
+                except Exception as e:
+                    st.error(f"❌ Failed to load message: {e}")
+                    return
+            if not ready:
+                st.info("⏳ Body still loading — it will show up on the next refresh.")
+                return
+            bodies[msg_id] = d
         
         # Tabs for different views
         tab1, tab2, tab3 = st.tabs(["📄 Text", "🌐 HTML", "📎 Details"])
@@ -751,6 +2300,252 @@ def render_message_card(msg: Dict, provider: TempMailProvider, state: Dict):
                     st.markdown(f"📎 {name} ({size})")
             else:
                 st.caption("No attachments")
+            
+            render_source(d, provider, state, msg_id)
+
+def render_source(d: Dict, provider: TempMailProvider, state: Dict, msg_id: str):
+    src = d.get("source")
+    if src is None:
+        key = ("source", mailbox_key(state), msg_id)
+        # A download that outlived an earlier run is picked up without a new click
+        requested = st.button("📜 Load raw source", key=f"source_{msg_id}")
+        if not requested and key not in st.session_state["pending_fetches"]:
+            return
+        with st.spinner("Downloading source..."):
+            try:
+                ready, src = call_within_budget(key, lambda: provider.read_source(state, msg_id),
+                                                kind="read_source")
+            except Exception as e:
+                st.error(f"❌ Failed to load source: {e}")
+                return
+        if not ready:
+            st.info("⏳ Source still downloading — it will show up on the next refresh.")
+            return
+        d["source"] = src
+    
+    st.caption(f"Raw source: {format_bytes(src.raw_size)}")
+    for name in ("Authentication-Results", "DKIM-Signature", "List-Unsubscribe", "Return-Path"):
+        value = src.header(name)
+        if value:
+            st.markdown(f"**{name}:** `{value[:200]}`")
+    received = src.headers("Received")
+    if received:
+        st.markdown(f"**Received hops:** {len(received)}")
+    for part in src.parts():
+        label = part.filename or part.content_type
+        st.caption(f"Part {part.index}: {label} ({format_bytes(part.encoded_size)} encoded)")
+    # Already inside the message card's expander, which can't hold another one
+    if st.toggle("Show all headers", key=f"headers_{msg_id}"):
+        st.code(src.raw_header_block(), language=None)
+
+# Exports are exempt from the run budget: they are started on request, can
+# run for minutes whatever the budget, show their own progress bar and
+# fetch through a pool of their own bounded by EXPORT_CONCURRENCY.
+def render_export(provider: TempMailProvider):
+    with st.expander("📦 Export inbox", expanded=False):
+        label = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+        extra = st.text_area(
+            "Other mailboxes",
+            placeholder="Optional: mailbox tokens to include, one per line",
+            key="export_handles",
+            height=80,
+        )
+        if st.button("📦 Prepare export", key="export_start"):
+            ext, mime = EXPORT_FORMATS[label]
+            email = st.session_state["email"]
+            try:
+                mailboxes = [(provider, email, st.session_state["provider_state"])]
+                mailboxes += [mailbox_from_handle(h) for h in extra.split()]
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                return
+            discard_export()
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            bar = st.progress(0.0, text="Exporting...")
+            too_large = (f"the export is larger than the {format_bytes(EXPORT_MAX_BYTES)} download limit; "
+                         "export fewer mailboxes at a time")
+            
+            # The unguessable file name is the only thing guarding the download URL
+            path = os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}.{ext}")
+            try:
+                with open(path, "wb") as f:
+                    def progress(done: int, total: int):
+                        # Stop as soon as it can't be served rather than after writing it all
+                        if f.tell() > EXPORT_MAX_BYTES:
+                            raise ValueError(too_large)
+                        bar.progress(done / total if total else 1.0, text=f"Exported {done}/{total}")
+                    
+                    count = export_mailboxes(
+                        mailboxes, ext, f,
+                        cached_bodies={email: st.session_state["message_bodies"]},
+                        progress=progress,
+                    )
+                if os.path.getsize(path) > EXPORT_MAX_BYTES:
+                    raise ValueError(too_large)
+            except Exception as e:
+                if os.path.exists(path):
+                    os.remove(path)
+                st.error(f"❌ Export failed: {e}")
+                return
+            bar.progress(1.0, text=f"Exported {count} message(s)")
+            st.session_state["export_file"] = {
+                "path": path,
+                "name": f"{email.split('@')[0]}-{datetime.now():%Y%m%d-%H%M%S}.{ext}",
+                "mime": mime,
+                "count": count,
+            }
+        
+        export = st.session_state.get("export_file")
+        if export and os.path.exists(export["path"]):
+            url = f"{EXPORT_URL}/{os.path.basename(export['path'])}"
+            st.markdown(
+                f'<a href="{url}" download="{export["name"]}" type="{export["mime"]}">'
+                f'⬇️ Download {export["count"]} message(s)</a>',
+                unsafe_allow_html=True,
+            )
+            st.caption(f"The link expires after {int(EXPORT_TTL // 60)} minutes.")
+
+# ----------------------------
+# Inbox Fragment
+# ----------------------------
+
+def apply_inbox(provider: TempMailProvider, state: Dict[str, Any], msgs: List[Dict[str, Any]]):
+    st.session_state["cached_messages"] = msgs
+    st.session_state["inbox_fetched_ts"] = time.time()
+    st.session_state["read_messages"] &= {str(m.get("id")) for m in msgs}
+    st.session_state["connection_status"] = "online"
+    get_event_bus().sync(provider, state, st.session_state["email"], msgs)
+
+# Called once the cached inbox is on screen: gives the background refresh
+# REVALIDATE_WAIT to finish and reruns just this fragment if the inbox
+# changed. Anything still running is picked up by the next run.
+def finish_revalidation(provider: TempMailProvider, state: Dict[str, Any], list_key: Tuple[str, ...]):
+    pending = st.session_state["pending_fetches"]
+    future = pending.get(list_key)
+    if future is None:
+        return
+    started = time.perf_counter()
+    wait([future], timeout=min(REVALIDATE_WAIT, budget_remaining()))
+    get_metrics().add_fetch(time.perf_counter() - started)
+    if not future.done() or future.exception() is not None:
+        return
+    del pending[list_key]
+    msgs = future.result()
+    changed = msgs != st.session_state["cached_messages"]
+    apply_inbox(provider, state, msgs)
+    if changed:
+        get_metrics().end_run()
+        st.rerun(scope="fragment")
+
+# Auto-refresh reruns only this fragment, so the page chrome, sidebar and
+# copy-button iframe are not rebuilt on every tick.
+def render_inbox(provider: TempMailProvider):
+    fragment_run = is_fragment_run()
+    if fragment_run:
+        get_metrics().begin_run()
+        start_run_budget()
+    st.session_state["requested_fetches"] = set()
+    
+    # Fetch messages; a refresh still running from an earlier run is picked up
+    # even when the throttle would skip this one.
+    state = st.session_state["provider_state"]
+    list_key = ("list", mailbox_key(state))
+    pending = st.session_state["pending_fetches"]
+    allow = throttle(2.0) or list_key in pending
+    get_metrics().cache_lookup("inbox", not allow)
+    fetched = st.session_state["inbox_fetched_ts"]
+    # Full runs can't rerun the fragment alone, so they take the budgeted path
+    revalidate = fragment_run and allow and fetched > 0 and time.time() - fetched <= MAX_STALENESS
+    stale = revalidating = False
+    msgs = st.session_state.get("cached_messages", [])
+    try:
+        if revalidate:
+            # Stale-while-revalidate: render from memory, refresh off-thread
+            future = submit_background(list_key, lambda: provider.list_messages(state))
+            if future is not None and future.done():
+                del pending[list_key]
+                msgs = future.result()
+                apply_inbox(provider, state, msgs)
+            else:
+                revalidating = True
+        elif allow:
+            with st.spinner("📬 Checking for new messages..."):
+                ready, result = call_within_budget(list_key, lambda: provider.list_messages(state),
+                                                   kind="list_messages")
+            if ready:
+                msgs = result
+                apply_inbox(provider, state, msgs)
+            else:
+                stale = True
+    except Exception as e:
+        st.error(f"❌ Error fetching messages: {e}")
+        st.session_state["connection_status"] = "offline"
+    
+    last_refresh = st.session_state.get("inbox_fetched_ts", 0)
+    status_slot = st.empty()
+    if stale:
+        status_slot.markdown(
+            '<span class="badge badge-stale">Stale</span> '
+            "⏳ The mail service is slow — showing cached messages; the refresh keeps running "
+            "and shows up on the next update.",
+            unsafe_allow_html=True,
+        )
+    elif last_refresh > 0:
+        note = " · 🔄 checking for new messages" if revalidating else ""
+        status_slot.caption(f"🕐 Last updated: {int(time.time() - last_refresh)}s ago{note}")
+    
+    render_stats()
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Search box
+    st.markdown('<div class="custom-card">', unsafe_allow_html=True)
+    st.markdown("### 📥 Inbox")
+    
+    search = st.text_input(
+        "🔍 Search messages",
+        placeholder="Search by sender or subject...",
+        label_visibility="collapsed"
+    )
+    st.session_state["search_query"] = search
+    
+    # Filter messages
+    filtered_msgs = filter_messages(msgs, st.session_state.get("search_query", ""))
+    
+    # Display messages
+    if not filtered_msgs:
+        if st.session_state.get("search_query"):
+            st.markdown("""
+            <div class="empty-state">
+                <div class="empty-state-icon">🔍</div>
+                <h3>No matching messages</h3>
+                <p>Try a different search term</p>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown("""
+            <div class="empty-state">
+                <div class="empty-state-icon">📭</div>
+                <h3>No messages yet</h3>
+                <p>Send an email to your temporary address and it will appear here</p>
+            </div>
+            """, unsafe_allow_html=True)
+    else:
+        st.caption(f"Showing {len(filtered_msgs)} message(s)")
+        for msg in filtered_msgs:
+            render_message_card(msg, provider, st.session_state["provider_state"])
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    if revalidating:
+        finish_revalidation(provider, state, list_key)
+        last_refresh = st.session_state["inbox_fetched_ts"]
+        note = " · 🔄 checking for new messages" if list_key in pending else ""
+        status_slot.caption(f"🕐 Last updated: {int(time.time() - last_refresh)}s ago{note}")
+    
+    prune_background(("list", "read", "source"))
+    if fragment_run:
+        get_memory_registry().touch(current_session_id(), st.session_state)
+        get_metrics().end_run()
 
 # ----------------------------
 # Main App
@@ -763,9 +2558,28 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+get_metrics().begin_run()
+start_run_budget()
+profiler = start_profiling()
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
+if METRICS_FILE:
+    start_metrics_file_exporter(METRICS_FILE)
+start_export_sweeper()
+
 apply_custom_css()
 init_state()
 
+# Reopen a mailbox from a shared link without creating a new account;
+# set_mailbox drops the handle from the URL once it has been used.
+handle = st.query_params.get("mailbox")
+if handle and handle != st.session_state.get("mailbox_handle"):
+    try:
+        set_mailbox(*decode_mailbox_handle(handle))
+    except ValueError as e:
+        st.warning(f"⚠️ Could not resume mailbox: {e}")
+        st.query_params.pop("mailbox", None)
+
 # Sidebar
 with st.sidebar:
     st.markdown("### ⚙️ Settings")
@@ -785,17 +2599,46 @@ with st.sidebar:
         st.session_state["email"] = None
         st.session_state["cached_messages"] = []
         st.session_state["last_fetch_ts"] = 0.0
+        st.session_state["inbox_fetched_ts"] = 0.0
         st.session_state["read_messages"] = set()
+        st.session_state["message_bodies"] = {}
+        st.session_state["unloaded_bodies"] = set()
+        st.session_state["pending_fetches"] = {}
+        st.session_state["mailbox_handle"] = None
+        st.session_state["mailbox_shared"] = False
+        st.query_params.pop("mailbox", None)
+        discard_export()
+        get_lifecycle().release_session(current_session_id())
         st.rerun()
     
     st.divider()
     
+    # Share / resume mailbox
+    st.markdown("**Mailbox Token**")
+    if st.session_state.get("mailbox_shared"):
+        st.code(st.session_state["mailbox_handle"], language=None)
+        st.caption("Reopens this inbox without a new account, also via this page's link. "
+                   "Anyone with it can read the mailbox.")
+    elif st.session_state.get("mailbox_handle"):
+        st.button("🔗 Share mailbox", on_click=share_mailbox, use_container_width=True)
+    st.text_input(
+        "Resume mailbox",
+        key="resume_token",
+        placeholder="Paste a mailbox token to reopen it...",
+        label_visibility="collapsed",
+        on_change=resume_from_token,
+    )
+    if st.session_state.get("resume_error"):
+        st.error(f"❌ {st.session_state.pop('resume_error')}")
+    
+    st.divider()
+    
     # Auto-refresh settings
     st.markdown("**Auto-Refresh**")
     auto = st.toggle("Enable auto-refresh", value=False)
+    refresh_interval = None
     if auto:
-        interval = st.slider("Refresh interval (seconds)", 5, 60, 15)
-        st_autorefresh(interval=interval * 1000, key="auto_refresh")
+        refresh_interval = st.slider("Refresh interval (seconds)", 5, 60, 15)
     
     st.divider()
     
@@ -825,6 +2668,90 @@ with st.sidebar:
     """)
     
     st.caption("Made with ❤️ using Streamlit")
+    
+    if is_admin():
+        st.divider()
+        registry = get_memory_registry()
+        with st.expander("🧠 Memory", expanded=False):
+            st.caption(
+                f"{format_bytes(registry.total_bytes())} of {format_bytes(registry.budget)} · "
+                f"evicted {registry.evicted_bodies} bodies, {registry.evicted_summaries} summaries"
+            )
+            for usage in registry.heaviest():
+                idle = int(time.time() - usage.last_seen)
+                st.markdown(
+                    f"`{usage.session_id[:8]}` {format_bytes(usage.total_bytes)} "
+                    f"({len(usage.bodies)} bodies, {len(usage.messages)} msgs, idle {idle}s)"
+                )
+        
+        metrics = get_metrics()
+        with st.expander("📈 Metrics", expanded=False):
+            last = metrics.last_run
+            if last:
+                st.caption(
+                    f"Last run {last['total'] * 1000:.0f} ms "
+                    f"(fetch {last['fetch'] * 1000:.0f} ms, render {last['render'] * 1000:.0f} ms)"
+                )
+            for cache in ("inbox", "body"):
+                rate = metrics.cache_hit_rate(cache)
+                if rate is not None:
+                    st.caption(f"{cache.title()} cache hit rate: {rate:.0%}")
+            st.caption(
+                f"Requests: {metrics.counter('tempmail_provider_requests_total'):.0f} · "
+                f"429s: {metrics.counter('tempmail_provider_rate_limited_total'):.0f} · "
+                f"retries: {metrics.counter('tempmail_provider_retries_total'):.0f}"
+            )
+            st.caption(
+                f"Deferred past run budget: "
+                f"{metrics.counter('tempmail_budget_deferred_calls_total'):.0f} calls"
+            )
+            st.caption(
+                f"Coalesced: {metrics.counter('tempmail_coalesced_calls_total', kind='inflight'):.0f} in-flight · "
+                f"{metrics.counter('tempmail_coalesced_calls_total', kind='reused'):.0f} reused · "
+                f"{metrics.counter('tempmail_coalesced_calls_total', kind='executed'):.0f} executed"
+            )
+            for (name, labels), hist in sorted(metrics.histograms.items()):
+                if name == "tempmail_provider_request_seconds" and hist.count:
+                    lbl = dict(labels)
+                    st.markdown(
+                        f"`{lbl['provider']} {lbl['endpoint']}` "
+                        f"{hist.count}× avg {hist.total / hist.count * 1000:.0f} ms"
+                    )
+            st.download_button(
+                "⬇️ Prometheus metrics",
+                metrics.render_prometheus(),
+                file_name="tempmail_metrics.txt",
+                mime="text/plain",
+            )
+        
+        with st.expander("🔬 Profiler", expanded=profiler is not None):
+            if st.button("Profile next run", key="profile_arm"):
+                st.session_state["profile_next_run"] = True
+                st.rerun()
+            profile_slot = st.empty()
+            if st.session_state.get("last_profile") and profiler is None:
+                with profile_slot.container():
+                    render_profile(st.session_state["last_profile"])
+        
+        lifecycle = get_lifecycle()
+        with st.expander("♻️ Cleanup", expanded=False):
+            st.caption(
+                f"Tracking {lifecycle.pending()} mailbox(es) · "
+                f"deleted {lifecycle.stats['accounts_deleted']} accounts, "
+                f"{lifecycle.stats['messages_reclaimed']} messages · "
+                f"{lifecycle.stats['failures']} failures"
+            )
+        
+        bus = get_event_bus()
+        if bus.enabled:
+            with st.expander("📣 Events", expanded=False):
+                st.caption(f"Published {bus.published} · dropped {bus.dropped} at the bus")
+                for worker in bus.workers:
+                    stats = worker.stats
+                    st.markdown(
+                        f"`{worker.sink.name}` queued {worker.queue.qsize()} · delivered {stats['delivered']} · "
+                        f"retries {stats['retries']} · dropped {stats['dropped']} · failed {stats['failed']}"
+                    )
 
 # Main content
 provider = pick_provider(st.session_state["provider_name"])
@@ -832,35 +2759,27 @@ provider = pick_provider(st.session_state["provider_name"])
 render_header()
 
 # Action buttons
-col1, col2, col3 = st.columns([2, 2, 3])
+col1, col2, _ = st.columns([2, 2, 3])
 
 with col1:
-    if st.button("✨ Generate New Email", type="primary", use_container_width=True):
+    # A mailbox still being created by an earlier run is picked up here
+    generating = next((k[1] for k in st.session_state["pending_fetches"] if k[0] == "generate"), None)
+    if st.button("✨ Generate New Email", type="primary", use_container_width=True) or generating:
+        name = generating or provider.name
         with st.spinner("🔄 Creating your mailbox..."):
             try:
-                email, state = provider.generate_email()
-                st.session_state["email"] = email
-                st.session_state["provider_state"] = state
-                st.session_state["cached_messages"] = []
-                st.session_state["last_fetch_ts"] = 0.0
-                st.session_state["read_messages"] = set()
-                st.session_state["email_created_at"] = datetime.now()
-                st.success("✅ Email address created successfully!")
-                time.sleep(0.5)
-                st.rerun()
+                if generate_mailbox(name):
+                    st.success("✅ Email address created successfully!")
+                    time.sleep(0.5)
+                    st.rerun()
             except requests.HTTPError as e:
-                if provider.name == "1secmail" and e.response and e.response.status_code == 403:
+                if name == "1secmail" and e.response is not None and e.response.status_code == 403:
                     st.warning("⚠️ 1secmail unavailable. Switching to Mail.tm...")
-                    backup = PROVIDERS["Mail.tm"]
                     try:
-                        email, state = backup.generate_email()
-                        st.session_state["provider_name"] = backup.name
-                        st.session_state["email"] = email
-                        st.session_state["provider_state"] = state
-                        st.session_state["email_created_at"] = datetime.now()
-                        st.success("✅ Switched to Mail.tm successfully!")
-                        time.sleep(0.5)
-                        st.rerun()
+                        if generate_mailbox("Mail.tm"):
+                            st.success("✅ Switched to Mail.tm successfully!")
+                            time.sleep(0.5)
+                            st.rerun()
                     except Exception as e2:
                         st.error(f"❌ Fallback failed: {e2}")
                 else:
@@ -868,6 +2787,10 @@ with col1:
             except Exception as e:
                 st.error(f"❌ Failed to generate email: {e}")
                 st.session_state["connection_status"] = "offline"
+        key = next((k for k in st.session_state["pending_fetches"] if k[0] == "generate"), None)
+        if key is not None:
+            st.info("⏳ The mail service is slow — your mailbox will show up as soon as it is ready.")
+            st.fragment(await_background, run_every=1)(key)
 
 with col2:
     if st.button("🔄 Refresh Inbox", use_container_width=True):
@@ -875,75 +2798,14 @@ with col2:
         st.session_state["last_fetch_ts"] = 0.0
         st.rerun()
 
-with col3:
-    if st.session_state.get("email"):
-        last_refresh = st.session_state.get("last_fetch_ts", 0)
-        if last_refresh > 0:
-            seconds_ago = int(time.time() - last_refresh)
-            st.caption(f"🕐 Last updated: {seconds_ago}s ago")
-
 st.markdown("<br>", unsafe_allow_html=True)
 
-# Email display and stats
+# Email display and inbox
 if st.session_state.get("email"):
     render_email_display()
     st.markdown("<br>", unsafe_allow_html=True)
-    render_stats()
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Search box
-    st.markdown('<div class="custom-card">', unsafe_allow_html=True)
-    st.markdown("### 📥 Inbox")
-    
-    search = st.text_input(
-        "🔍 Search messages",
-        placeholder="Search by sender or subject...",
-        label_visibility="collapsed"
-    )
-    st.session_state["search_query"] = search
-    
-    # Fetch messages
-    allow = throttle(2.0)
-    if allow:
-        with st.spinner("📬 Checking for new messages..."):
-            try:
-                msgs = provider.list_messages(st.session_state["provider_state"])
-                st.session_state["cached_messages"] = msgs
-                st.session_state["connection_status"] = "online"
-            except Exception as e:
-                st.error(f"❌ Error fetching messages: {e}")
-                st.session_state["connection_status"] = "offline"
-                msgs = st.session_state.get("cached_messages", [])
-    else:
-        msgs = st.session_state.get("cached_messages", [])
-    
-    # Filter messages
-    filtered_msgs = filter_messages(msgs, st.session_state.get("search_query", ""))
-    
-    # Display messages
-    if not filtered_msgs:
-        if st.session_state.get("search_query"):
-            st.markdown("""
-            <div class="empty-state">
-                <div class="empty-state-icon">🔍</div>
-                <h3>No matching messages</h3>
-                <p>Try a different search term</p>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-            <div class="empty-state">
-                <div class="empty-state-icon">📭</div>
-                <h3>No messages yet</h3>
-                <p>Send an email to your temporary address and it will appear here</p>
-            </div>
-            """, unsafe_allow_html=True)
-    else:
-        st.caption(f"Showing {len(filtered_msgs)} message(s)")
-        for msg in filtered_msgs:
-            render_message_card(msg, provider, st.session_state["provider_state"])
-    
-    st.markdown('</div>', unsafe_allow_html=True)
+    st.fragment(render_inbox, run_every=refresh_interval)(provider)
+    render_export(provider)
 else:
     # Empty state - no email generated yet
     st.markdown("""
@@ -986,4 +2848,10 @@ else:
             <h3>⚡ Real-time Updates</h3>
             <p>Receive and read messages instantly with auto-refresh support</p>
         </div>
-        """, unsafe_allow_html=True)
\ No newline at end of file
+        """, unsafe_allow_html=True)
+
+get_memory_registry().touch(current_session_id(), st.session_state)
+get_metrics().end_run()
+if profiler is not None:
+    with profile_slot.container():
+        render_profile(finish_profiling(profiler))
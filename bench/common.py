@@ -0,0 +1,79 @@
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+RESULTS_DIR = os.path.join(REPO_ROOT, "bench", "results")
+
+
+def point_app_at(mailtm_base: str, onesec_base: str):
+    os.environ["TEMPMAIL_MAILTM_API_BASE"] = mailtm_base
+    os.environ["TEMPMAIL_1SECMAIL_API_BASE"] = onesec_base + "/api/v1/"
+
+
+def load_app() -> Any:
+    # app.py is a Streamlit script; importing it runs the page once in bare
+    # mode, which renders nothing but gives us the provider classes.
+    from streamlit import logger
+
+    logger.set_log_level("ERROR")
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    if "app" in sys.modules:
+        return importlib.reload(sys.modules["app"])
+    return importlib.import_module("app")
+
+
+def summarize(samples: List[float], wall: Optional[float] = None) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000
+
+    out = {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+    if wall:
+        out["throughput_per_s"] = len(samples) / wall
+    return out
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def write_results(results: Dict[str, Any], path: Optional[str], prefix: str) -> str:
+    if not path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], key: str = "mean_ms") -> List[str]:
+    lines = []
+    for name, cur in sorted(current.get("cases", {}).items()):
+        base = baseline.get("cases", {}).get(name)
+        if not base or key not in cur or not base.get(key):
+            continue
+        change = (cur[key] - base[key]) / base[key]
+        lines.append(f"{name:<40} {base[key]:>10.2f} -> {cur[key]:>10.2f} {key} ({change:+.1%})")
+    return lines
@@ -0,0 +1,195 @@
+import argparse
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+from bench.common import APP_PATH, environment, load_app, point_app_at, summarize, write_results
+from bench.standins import StandinConfig, StandinServer, start_standins
+
+SEARCH_TERMS = ("sender1", "Benchmark", "code", "nothing-matches", "")
+# Every simulated action is a full-script rerun. AppTest can't run the inbox
+# fragment on its own, so auto-refresh ticks (fragment-only, rendering the
+# cached inbox while it revalidates) are not measured; "refresh" numbers are
+# an upper bound for them.
+SCOPE = "full-reruns"
+
+
+def share_runtime_across_apptests():
+    # AppTest installs a mock Runtime singleton per run and clears it when the
+    # run ends, which breaks other sessions' scripts still running in parallel.
+    # Fall back to one shared mock instead so runs can overlap like they do in
+    # a real server process.
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared)
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        # ru_maxrss is a high-water mark (KB on Linux), good enough off Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class SimulatedSession:
+    def __init__(self, index: int, duration: float, think_time: float, seed: int):
+        self.index = index
+        self.duration = duration
+        self.think_time = think_time
+        self.rng = random.Random(seed + index)
+        self.latencies: List[float] = []
+        self.actions: Dict[str, int] = {}
+        self.errors: List[str] = []
+
+    def _run(self, at: Any, action: str):
+        start = time.perf_counter()
+        at.run()
+        # Initial load and mailbox creation are one-off; percentiles track steady state.
+        if action not in ("load", "generate"):
+            self.latencies.append(time.perf_counter() - start)
+        self.actions[action] = self.actions.get(action, 0) + 1
+        if at.exception:
+            self.errors.append(str(at.exception[0].value))
+
+    def __call__(self):
+        # AppTest itself occasionally fails when sessions overlap (widget
+        # state lookups race); report it rather than losing the thread silently.
+        try:
+            self._session()
+        except Exception as e:
+            self.errors.append(f"harness: {e!r}")
+
+    def _session(self):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(APP_PATH, default_timeout=300)
+        self._run(at, "load")
+        at.main.button[0].click()
+        self._run(at, "generate")
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            roll = self.rng.random()
+            if roll < 0.6:
+                # A manual refresh: full rerun with the fetch throttle reset,
+                # so the inbox is listed within the run budget.
+                at.session_state["last_fetch_ts"] = 0.0
+                self._run(at, "refresh")
+            elif roll < 0.8:
+                at.main.text_input[0].input(self.rng.choice(SEARCH_TERMS))
+                self._run(at, "search")
+            else:
+                # Opening a card is a plain rerun. Bodies come from the session
+                # cache after their first fetch, so this is mostly render cost.
+                self._run(at, "open")
+            time.sleep(self.think_time * self.rng.uniform(0.5, 1.5))
+
+
+def run_level(sessions: int, server: StandinServer, args: argparse.Namespace) -> Dict[str, Any]:
+    server.reset_counts()
+    rss_before = rss_mb()
+    workers = [SimulatedSession(i, args.duration, args.think_time, args.seed) for i in range(sessions)]
+    threads = [threading.Thread(target=w, name=f"session-{w.index}", daemon=True) for w in workers]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    latencies = [lat for w in workers for lat in w.latencies]
+    actions: Dict[str, int] = {}
+    for w in workers:
+        for name, count in w.actions.items():
+            actions[name] = actions.get(name, 0) + count
+    upstream = server.request_count
+    rss_after = rss_mb()
+    return dict(
+        summarize(latencies, wall),
+        sessions=sessions,
+        wall_s=wall,
+        actions=actions,
+        upstream_requests=upstream,
+        upstream_per_rerun=upstream / max(1, len(latencies)),
+        upstream_per_session_minute=upstream / sessions / (wall / 60),
+        upstream_by_endpoint=dict(server.endpoint_counts),
+        rss_before_mb=rss_before,
+        rss_after_mb=rss_after,
+        rss_growth_per_session_mb=(rss_after - rss_before) / sessions,
+        errors=[e for w in workers for e in w.errors][:10],
+    )
+
+
+def find_saturation(levels: List[Dict[str, Any]], slo_ms: float) -> Dict[str, Any]:
+    best = 0.0
+    for level in levels:
+        if level.get("p90_ms", 0) > slo_ms:
+            return {"sessions": level["sessions"], "reason": f"p90 above {slo_ms:.0f} ms"}
+        throughput = level.get("throughput_per_s", 0)
+        if best and throughput < best * 1.05 and level["sessions"] > 1:
+            return {"sessions": level["sessions"], "reason": "throughput stopped growing"}
+        best = max(best, throughput)
+    return {}
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description="Drive N simulated Streamlit sessions of app.py against local provider stand-ins. "
+                    "Only full-script reruns are simulated; fragment-only auto-refresh ticks are not.")
+    parser.add_argument("--sessions", default="1,5,10,25", help="Comma-separated session counts to step through.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds each session stays active.")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between user actions.")
+    parser.add_argument("--inbox-size", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of artificial upstream latency.")
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p90 rerun latency considered saturated.")
+    parser.add_argument("--output", help="Result file (default: bench/results/loadtest-<timestamp>.json).")
+    args = parser.parse_args(argv)
+
+    config = StandinConfig(latency=args.latency, inbox_size=args.inbox_size,
+                           rate_limit_every=args.rate_limit_every)
+    mailtm, onesec = start_standins(config)
+    levels: List[Dict[str, Any]] = []
+    try:
+        point_app_at(mailtm.base_url, onesec.base_url)
+        load_app()
+        share_runtime_across_apptests()
+        for n in [int(x) for x in args.sessions.split(",") if x.strip()]:
+            level = run_level(n, mailtm, args)
+            levels.append(level)
+            print(
+                f"{n:>4} sessions  {level.get('throughput_per_s', 0):>7.2f} reruns/s  "
+                f"p50 {level.get('p50_ms', 0):>8.1f} ms  p90 {level.get('p90_ms', 0):>8.1f} ms  "
+                f"p99 {level.get('p99_ms', 0):>8.1f} ms  "
+                f"upstream/rerun {level['upstream_per_rerun']:>5.2f}  "
+                f"rss {level['rss_after_mb']:>7.1f} MB"
+            )
+    finally:
+        mailtm.stop()
+        onesec.stop()
+
+    saturation = find_saturation(levels, args.slo_ms)
+    if saturation:
+        print(f"saturated at {saturation['sessions']} sessions ({saturation['reason']})")
+    path = write_results({"config": vars(args), "scope": SCOPE, "environment": environment(), "levels": levels,
+                          "saturation": saturation}, args.output, "loadtest")
+    print(f"results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
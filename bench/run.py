@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from bench.common import APP_PATH, compare, environment, load_app, point_app_at, summarize, write_results
+from bench.standins import StandinConfig, StandinServer, start_standins
+
+INBOX_SIZES = (0, 30, 300)
+
+
+def timed(fn: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    samples: List[float] = []
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - wall_start)
+
+
+def bench_providers(app: Any, servers: Dict[str, StandinServer], iterations: int) -> Dict[str, Any]:
+    cases: Dict[str, Any] = {}
+    for provider in app.PROVIDERS.values():
+        server = servers[provider.name]
+        server.config.inbox_size = 0
+        cases[f"{provider.name}/generate_email"] = timed(provider.generate_email, iterations)
+        for size in INBOX_SIZES:
+            server.config.inbox_size = size
+            _, state = provider.generate_email()
+            msgs = provider.list_messages(state)
+            cases[f"{provider.name}/list_messages/{size}"] = timed(lambda: provider.list_messages(state), iterations)
+            if msgs:
+                ids = [m["id"] for m in msgs]
+                picks = iter(ids * (iterations // len(ids) + 1))
+                cases[f"{provider.name}/read_message/{size}"] = timed(
+                    lambda: provider.read_message(state, next(picks)), iterations)
+    return cases
+
+
+def bench_reruns(app: Any, server: StandinServer, reruns: int) -> Dict[str, Any]:
+    from streamlit.testing.v1 import AppTest
+
+    provider = app.PROVIDERS["Mail.tm"]
+    cases: Dict[str, Any] = {}
+    for size in INBOX_SIZES:
+        server.config.inbox_size = size
+        email, state = provider.generate_email()
+        at = AppTest.from_file(APP_PATH, default_timeout=300)
+        at.session_state["provider_name"] = provider.name
+        at.session_state["email"] = email
+        at.session_state["provider_state"] = state
+        samples: List[float] = []
+        requests_per_run: List[int] = []
+        for _ in range(reruns + 1):
+            at.session_state["last_fetch_ts"] = 0.0
+            before = server.request_count
+            start = time.perf_counter()
+            at.run()
+            samples.append(time.perf_counter() - start)
+            requests_per_run.append(server.request_count - before)
+            if at.exception:
+                raise RuntimeError(f"app raised during rerun: {at.exception[0].value}")
+        cases[f"rerun/{size}/cold"] = dict(summarize(samples[:1]), upstream_requests=requests_per_run[0])
+        cases[f"rerun/{size}/warm"] = dict(
+            summarize(samples[1:]), upstream_requests=sum(requests_per_run[1:]) / max(1, reruns))
+    return cases
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark providers and full-script reruns against local Mail.tm/1secmail stand-ins.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of artificial upstream latency.")
+    parser.add_argument("--body-bytes", type=int, default=2000)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every Nth request with 429.")
+    parser.add_argument("--skip-reruns", action="store_true")
+    parser.add_argument("--run-budget", type=float, default=600.0,
+                        help="TEMPMAIL_RUN_BUDGET for rerun cases; kept high so they time the work, not the budget.")
+    parser.add_argument("--output", help="Result file (default: bench/results/bench-<timestamp>.json).")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    args = parser.parse_args(argv)
+
+    config = StandinConfig(latency=args.latency, body_bytes=args.body_bytes,
+                           rate_limit_every=args.rate_limit_every)
+    # With the default 3s budget a cold rerun of a large inbox stops waiting
+    # at the deadline, and the timing measures RUN_BUDGET instead of the work.
+    os.environ["TEMPMAIL_RUN_BUDGET"] = str(args.run_budget)
+    mailtm, onesec = start_standins(config)
+    try:
+        point_app_at(mailtm.base_url, onesec.base_url)
+        app = load_app()
+        cases = bench_providers(app, {"Mail.tm": mailtm, "1secmail": onesec}, args.iterations)
+        if not args.skip_reruns:
+            cases.update(bench_reruns(app, mailtm, args.reruns))
+    finally:
+        mailtm.stop()
+        onesec.stop()
+
+    results = {"config": vars(args), "environment": environment(), "cases": cases}
+    path = write_results(results, args.output, "bench")
+    for name, case in sorted(cases.items()):
+        print(f"{name:<40} mean {case.get('mean_ms', 0):>9.2f} ms  p90 {case.get('p90_ms', 0):>9.2f} ms")
+    print(f"results written to {path}")
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(results, json.load(f))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,311 @@
+import json
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# ----------------------------
+# Stand-in configuration
+# ----------------------------
+
+@dataclass
+class StandinConfig:
+    latency: float = 0.0
+    inbox_size: int = 0
+    body_bytes: int = 2000
+    # Every Nth request is answered with 429 (0 disables).
+    rate_limit_every: int = 0
+    retry_after: int = 0
+    domain: str = "bench.test"
+
+
+def fake_messages(address: str, count: int, body_bytes: int) -> List[Dict[str, Any]]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    filler = ("Lorem ipsum dolor sit amet. " * (body_bytes // 28 + 1))[:body_bytes]
+    out = []
+    for i in range(count):
+        received = start + timedelta(minutes=i)
+        out.append({
+            "id": str(10**13 + (zlib.crc32(address.encode()) % 10**6) * 10**6 + i),
+            "from": f"sender{i}@example.com",
+            "subject": f"Benchmark message {i}",
+            "date": received,
+            "text": f"Your code is {100000 + i}.\n{filler}",
+            "html": f"<p>Your code is <b>{100000 + i}</b>.</p><p>{filler}</p>",
+        })
+    return out
+
+
+def raw_source(m: Dict[str, Any], to: str) -> bytes:
+    msg = EmailMessage()
+    msg["Received"] = "from mx1.example.com by in.bench.test; " + format_datetime(m["date"])
+    msg["Received"] = "from client.example.com by mx1.example.com; " + format_datetime(m["date"])
+    msg["DKIM-Signature"] = "v=1; a=rsa-sha256; d=example.com; s=bench; b=ZmFrZQ=="
+    msg["List-Unsubscribe"] = "<mailto:unsubscribe@example.com>"
+    msg["From"] = m["from"]
+    msg["To"] = to
+    msg["Subject"] = m["subject"]
+    msg["Date"] = format_datetime(m["date"])
+    msg.set_content(m["text"])
+    msg.add_alternative(m["html"], subtype="html")
+    msg.add_attachment(b"%PDF-1.4 bench" * 64, maintype="application", subtype="pdf", filename="invoice.pdf")
+    return msg.as_bytes()
+
+
+# ----------------------------
+# Server plumbing
+# ----------------------------
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler: type, config: StandinConfig, port: int = 0):
+        super().__init__(("127.0.0.1", port), handler)
+        self.config = config
+        self.request_count = 0
+        self.endpoint_counts: Dict[str, int] = {}
+        self.mailboxes: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, endpoint: str) -> bool:
+        with self.lock:
+            self.request_count += 1
+            self.endpoint_counts[endpoint] = self.endpoint_counts.get(endpoint, 0) + 1
+            every = self.config.rate_limit_every
+            return bool(every) and self.request_count % every == 0
+
+    def messages_for(self, address: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            box = self.mailboxes.setdefault(address, {})
+            if "messages" not in box:
+                box["messages"] = fake_messages(address, self.config.inbox_size, self.config.body_bytes)
+            return box["messages"]
+
+    def reset_counts(self):
+        with self.lock:
+            self.request_count = 0
+            self.endpoint_counts = {}
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server: StandinServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, payload: Any = None, content_type: str = "application/json",
+               headers: Optional[Dict[str, str]] = None):
+        if isinstance(payload, (bytes, str)):
+            body = payload.encode() if isinstance(payload, str) else payload
+        else:
+            body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _admit(self, endpoint: str) -> bool:
+        limited = self.server.count(endpoint)
+        if self.server.config.latency:
+            time.sleep(self.server.config.latency)
+        if limited:
+            self._reply(429, {"detail": "Too Many Requests"},
+                        headers={"Retry-After": str(self.server.config.retry_after)})
+            return False
+        return True
+
+
+# ----------------------------
+# Mail.tm stand-in
+# ----------------------------
+
+class MailTmHandler(StandinHandler):
+    def _account(self) -> Optional[str]:
+        auth = self.headers.get("Authorization", "")
+        token = auth[len("Bearer "):] if auth.startswith("Bearer ") else ""
+        with self.server.lock:
+            for address, box in self.server.mailboxes.items():
+                if box.get("token") == token:
+                    return address
+        return None
+
+    def _summary(self, m: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": m["id"],
+            "from": {"address": m["from"], "name": ""},
+            "subject": m["subject"],
+            "receivedAt": m["date"].isoformat(),
+            "seen": False,
+        }
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/domains":
+            if self._admit("/domains"):
+                self._reply(200, {"hydra:member": [{"id": "d1", "domain": self.server.config.domain}]})
+            return
+        if path == "/me":
+            if not self._admit("/me"):
+                return
+            address = self._account()
+            if address is None:
+                self._reply(401, {"message": "Invalid JWT Token"})
+                return
+            self._reply(200, {"id": self.server.mailboxes[address]["id"], "address": address})
+            return
+        if path.startswith("/messages"):
+            endpoint = "/messages" if path == "/messages" else "/messages/{id}"
+            if path.endswith("/download"):
+                endpoint = "/messages/{id}/download"
+            if not self._admit(endpoint):
+                return
+            address = self._account()
+            if address is None:
+                self._reply(401, {"message": "Invalid JWT Token"})
+                return
+            msgs = self.server.messages_for(address)
+            if path == "/messages":
+                members = [self._summary(m) for m in reversed(msgs)]
+                self._reply(200, {"hydra:member": members, "hydra:totalItems": len(members)})
+                return
+            if path.endswith("/download"):
+                msg_id = path.split("/")[2]
+                for m in msgs:
+                    if m["id"] == msg_id:
+                        self._reply(200, raw_source(m, address), content_type="message/rfc822")
+                        return
+                self._reply(404, {"message": "Not Found"})
+                return
+            msg_id = path.rsplit("/", 1)[1]
+            for m in msgs:
+                if m["id"] == msg_id:
+                    detail = self._summary(m)
+                    detail.update({"text": m["text"], "html": [m["html"]], "attachments": []})
+                    self._reply(200, detail)
+                    return
+            self._reply(404, {"message": "Not Found"})
+            return
+        self._reply(404, {"message": "Not Found"})
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        if not path.startswith("/accounts/"):
+            self._reply(404, {"message": "Not Found"})
+            return
+        if not self._admit("/accounts/{id}"):
+            return
+        address = self._account()
+        account_id = path.rsplit("/", 1)[1]
+        with self.server.lock:
+            box = self.server.mailboxes.get(address) if address else None
+            allowed = box is not None and box.get("id") == account_id
+            if allowed:
+                del self.server.mailboxes[address]
+        if not allowed:
+            self._reply(401 if box is None else 403, {"message": "Access Denied."})
+            return
+        self._reply(204)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        payload = self._read_json()
+        address = payload.get("address", "")
+        if path == "/accounts":
+            if not self._admit("/accounts"):
+                return
+            with self.server.lock:
+                if address in self.server.mailboxes:
+                    self._reply(422, {"detail": "address: This value is already used."})
+                    return
+                self.server.mailboxes[address] = {"password": payload.get("password"), "id": uuid.uuid4().hex}
+                account_id = self.server.mailboxes[address]["id"]
+            self._reply(201, {"id": account_id, "address": address})
+            return
+        if path == "/token":
+            if not self._admit("/token"):
+                return
+            with self.server.lock:
+                box = self.server.mailboxes.get(address)
+                if not box or box.get("password") != payload.get("password"):
+                    self._reply(401, {"message": "Invalid credentials."})
+                    return
+                box["token"] = uuid.uuid4().hex
+            self._reply(200, {"id": box["id"], "token": box["token"]})
+            return
+        self._reply(404, {"message": "Not Found"})
+
+
+# ----------------------------
+# 1secmail stand-in
+# ----------------------------
+
+class OneSecMailHandler(StandinHandler):
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        action = params.get("action", "")
+        if not self._admit(action):
+            return
+        if action == "genRandomMailbox":
+            count = int(params.get("count", 1))
+            self._reply(200, [f"{uuid.uuid4().hex[:10]}@{self.server.config.domain}" for _ in range(count)])
+            return
+        address = f"{params.get('login', '')}@{params.get('domain', '')}"
+        msgs = self.server.messages_for(address)
+        if action == "getMessages":
+            self._reply(200, [
+                {"id": int(m["id"]), "from": m["from"], "subject": m["subject"],
+                 "date": m["date"].strftime("%Y-%m-%d %H:%M:%S")}
+                for m in msgs
+            ])
+            return
+        if action == "readMessage":
+            for m in msgs:
+                if m["id"] == params.get("id"):
+                    self._reply(200, {
+                        "id": int(m["id"]), "from": m["from"], "subject": m["subject"],
+                        "date": m["date"].strftime("%Y-%m-%d %H:%M:%S"),
+                        "attachments": [], "body": m["html"],
+                        "textBody": m["text"], "htmlBody": m["html"],
+                    })
+                    return
+            self._reply(200, "Message not found", content_type="text/plain")
+            return
+        self._reply(400, "Wrong action", content_type="text/plain")
+
+
+def start_standins(config: StandinConfig) -> Tuple[StandinServer, StandinServer]:
+    mailtm = StandinServer(MailTmHandler, config).start()
+    onesec = StandinServer(OneSecMailHandler, config).start()
+    return mailtm, onesec
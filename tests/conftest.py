@@ -0,0 +1,38 @@
+import dataclasses
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from bench.common import load_app, point_app_at  # noqa: E402
+from bench.standins import StandinConfig, StandinServer, start_standins  # noqa: E402
+
+# Keep the default lifecycle manager from reading or writing the shared state file.
+os.environ.setdefault("TEMPMAIL_CLEANUP_STATE", "")
+
+
+@pytest.fixture(scope="session")
+def standins():
+    mailtm, onesec = start_standins(StandinConfig())
+    point_app_at(mailtm.base_url, onesec.base_url)
+    yield mailtm, onesec
+    mailtm.stop()
+    onesec.stop()
+
+
+@pytest.fixture(scope="session")
+def app(standins):
+    return load_app()
+
+
+@pytest.fixture
+def mailtm(standins) -> StandinServer:
+    server = standins[0]
+    server.reset_counts()
+    yield server
+    for field in dataclasses.fields(StandinConfig):
+        setattr(server.config, field.name, field.default)
@@ -0,0 +1,32 @@
+import time
+from typing import Any, Callable
+
+
+def stub(base: type, **attrs: Any) -> Any:
+    # An instance of `base` whose methods are the given plain callables
+    # (bound methods of a real provider work too); other values become
+    # class attributes.
+    members = {k: staticmethod(v) if callable(v) else v for k, v in attrs.items()}
+    return type(f"Stub{base.__name__}", (base,), members)()
+
+
+def failing(times: int, then: Callable[..., Any]) -> Callable[..., Any]:
+    # Raises for the first `times` calls, then defers to `then`.
+    remaining = [times]
+
+    def call(*args: Any) -> Any:
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            raise RuntimeError("injected failure")
+        return then(*args)
+
+    return call
+
+
+def wait_for(predicate: Callable[[], bool], timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+import requests
+
+
+def run_concurrently(fn, n: int):
+    threads = [threading.Thread(target=fn) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+
+
+def test_concurrent_calls_share_one_request(app, mailtm):
+    provider = app.PROVIDERS["Mail.tm"]
+    mailtm.config.inbox_size = 3
+    _, state = provider.generate_email()
+    coalesced = app.CoalescingProvider(provider, app.SingleFlight(reuse_window=0))
+    mailtm.config.latency = 0.2
+    mailtm.reset_counts()
+    results = []
+
+    run_concurrently(lambda: results.append(coalesced.list_messages(state)), 5)
+
+    assert mailtm.endpoint_counts == {"/messages": 1}
+    assert len(results) == 5
+    assert all(r == results[0] for r in results)
+    # Each caller gets its own copy of the shared list.
+    assert len({id(r) for r in results}) == 5
+
+
+def test_concurrent_failure_reaches_every_caller(app, mailtm):
+    provider = app.PROVIDERS["Mail.tm"]
+    _, state = provider.generate_email()
+    coalesced = app.CoalescingProvider(provider, app.SingleFlight(reuse_window=1.0))
+    mailtm.config.latency = 0.2
+    mailtm.reset_counts()
+    errors = []
+
+    def read():
+        try:
+            coalesced.read_message(state, "missing")
+        except requests.HTTPError as e:
+            errors.append(e)
+
+    run_concurrently(read, 5)
+
+    assert mailtm.endpoint_counts == {"/messages/{id}": 1}
+    assert len(errors) == 5
+    assert all(e is errors[0] for e in errors)
+
+    # Failures are not reused: the next call goes upstream again.
+    with pytest.raises(requests.HTTPError):
+        coalesced.read_message(state, "missing")
+    assert mailtm.endpoint_counts == {"/messages/{id}": 2}
+
+
+def test_finished_result_is_reused_until_the_window_expires(app, mailtm):
+    provider = app.PROVIDERS["Mail.tm"]
+    mailtm.config.inbox_size = 2
+    _, state = provider.generate_email()
+    coalesced = app.CoalescingProvider(provider, app.SingleFlight(reuse_window=0.3))
+    mailtm.reset_counts()
+
+    first = coalesced.list_messages(state)
+    second = coalesced.list_messages(state)
+    assert mailtm.endpoint_counts == {"/messages": 1}
+    assert second == first and second is not first
+
+    time.sleep(0.4)
+    coalesced.list_messages(state)
+    assert mailtm.endpoint_counts == {"/messages": 2}
+
+
+def test_callers_with_other_credentials_do_not_share_results(app, mailtm):
+    provider = app.PROVIDERS["Mail.tm"]
+    mailtm.config.inbox_size = 2
+    victim, state = provider.generate_email()
+    forged = {"address": victim, "token": "forged"}
+    coalesced = app.CoalescingProvider(provider, app.SingleFlight(reuse_window=5.0))
+    mailtm.config.latency = 0.2
+    results, errors = [], []
+
+    def forge():
+        time.sleep(0.05)
+        try:
+            results.append(coalesced.list_messages(forged))
+        except requests.HTTPError as e:
+            errors.append(e.response.status_code)
+
+    # While the owner's request is in flight...
+    threads = [threading.Thread(target=lambda: coalesced.list_messages(state)), threading.Thread(target=forge)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    # ...and while its result is being reused.
+    forge()
+
+    assert results == []
+    assert errors == [401, 401]
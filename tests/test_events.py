@@ -0,0 +1,49 @@
+import time
+
+from helpers import failing, stub, wait_for
+
+
+def make_sink(app, failures: int):
+    batches = []
+    sink = stub(app.EventSink, name="recording",
+                deliver=failing(failures, lambda batch: batches.append(list(batch))))
+    sink.batches = batches
+    return sink
+
+
+def test_worker_retries_a_failed_batch(app):
+    sink = make_sink(app, failures=1)
+    worker = app.SinkWorker(sink, batch_size=10, flush_interval=0.05, max_attempts=3)
+    worker.offer({"id": 1})
+
+    assert wait_for(lambda: worker.stats["delivered"] == 1)
+    assert worker.stats["retries"] == 1
+    assert sink.batches == [[{"id": 1}]]
+
+
+def test_worker_gives_up_after_max_attempts(app):
+    sink = make_sink(app, failures=5)
+    worker = app.SinkWorker(sink, batch_size=10, flush_interval=0.05, max_attempts=1)
+    worker.offer({"id": 1})
+
+    assert wait_for(lambda: worker.stats["failed"] == 1)
+    assert worker.stats["delivered"] == 0
+
+
+def test_first_sync_of_an_unknown_mailbox_emits_nothing(app, mailtm):
+    mailtm.config.inbox_size = 3
+    provider = app.PROVIDERS["Mail.tm"]
+    resumed, resumed_state = provider.generate_email()
+    created, created_state = provider.generate_email()
+    sink = make_sink(app, failures=0)
+    bus = app.EventBus([sink], include_body=False)
+    bus.watch_new(created)
+
+    bus.sync(provider, resumed_state, resumed, provider.list_messages(resumed_state))
+    bus.sync(provider, created_state, created, provider.list_messages(created_state))
+
+    assert wait_for(lambda: sum(len(b) for b in sink.batches) == 3)
+    time.sleep(0.2)
+    events = [e for b in sink.batches for e in b]
+    assert len(events) == 3
+    assert {e["mailbox"] for e in events} == {created}
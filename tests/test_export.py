@@ -0,0 +1,51 @@
+import io
+import json
+import random
+import time
+
+from helpers import stub
+
+
+def make_jittery(app, inner, fail_ids=()):
+    # Body reads finish in random order so the writer has to restore it.
+    def read_message(state, msg_id):
+        time.sleep(random.uniform(0, 0.05))
+        if msg_id in fail_ids:
+            raise RuntimeError("read failed")
+        return inner.read_message(state, msg_id)
+
+    return stub(app.TempMailProvider, name=inner.name, list_messages=inner.list_messages,
+                read_message=read_message)
+
+
+def test_export_keeps_listing_order(app, mailtm):
+    mailtm.config.inbox_size = 12
+    inner = app.PROVIDERS["Mail.tm"]
+    provider = make_jittery(app, inner)
+    mailboxes = [(provider, *inner.generate_email()) for _ in range(2)]
+    expected = [(address, m["id"]) for _, address, state in mailboxes for m in inner.list_messages(state)]
+    progress = []
+    out = io.BytesIO()
+
+    written = app.export_mailboxes(mailboxes, "jsonl", out, concurrency=4,
+                                   progress=lambda done, total: progress.append((done, total)))
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert written == len(expected) == 24
+    assert [(r["mailbox"], r["id"]) for r in records] == expected
+    assert progress == [(i, 24) for i in range(1, 25)]
+
+
+def test_export_skips_failed_reads_without_reordering(app, mailtm):
+    mailtm.config.inbox_size = 6
+    inner = app.PROVIDERS["Mail.tm"]
+    address, state = inner.generate_email()
+    ids = [m["id"] for m in inner.list_messages(state)]
+    provider = make_jittery(app, inner, fail_ids={ids[1], ids[4]})
+    out = io.BytesIO()
+
+    written = app.export_mailboxes([(provider, address, state)], "jsonl", out, concurrency=3)
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert written == 4
+    assert [r["id"] for r in records] == [i for i in ids if i not in (ids[1], ids[4])]
@@ -0,0 +1,68 @@
+import pytest
+import requests
+
+
+def test_handle_round_trip(app, mailtm):
+    provider = app.PROVIDERS["Mail.tm"]
+    email, state = provider.generate_email()
+
+    handle = app.encode_mailbox_handle(provider.name, email, state)
+
+    assert "=" not in handle
+    assert app.decode_mailbox_handle(handle) == (provider.name, email, state)
+
+
+def test_1secmail_handle_round_trip(app):
+    state = {"login": "abc", "domain": "bench.test"}
+    handle = app.encode_mailbox_handle("1secmail", "abc@bench.test", state)
+    assert app.decode_mailbox_handle(handle) == ("1secmail", "abc@bench.test", state)
+
+
+@pytest.mark.parametrize("handle", [
+    "",
+    "not base64!",
+    "e30",  # {}
+])
+def test_malformed_handles_are_rejected(app, handle):
+    with pytest.raises(ValueError):
+        app.decode_mailbox_handle(handle)
+
+
+def test_handle_for_another_address_is_rejected(app):
+    state = {"address": "mine@bench.test", "token": "t"}
+    with pytest.raises(ValueError):
+        app.decode_mailbox_handle(app.encode_mailbox_handle("Mail.tm", "victim@bench.test", state))
+    with pytest.raises(ValueError):
+        app.decode_mailbox_handle(app.encode_mailbox_handle("Unknown", "mine@bench.test", state))
+
+
+def test_expired_token_is_refreshed_once(app, mailtm):
+    mailtm.config.inbox_size = 2
+    provider = app.PROVIDERS["Mail.tm"]
+    email, state = provider.generate_email()
+    old_token = state["token"]
+    # Logging in again issues a new token and invalidates the one in `state`.
+    provider._login(email, state["password"])
+    mailtm.reset_counts()
+    refreshes = app.get_metrics().counter("tempmail_token_refreshes_total")
+
+    messages = provider.list_messages(state)
+
+    assert len(messages) == 2
+    assert state["token"] != old_token
+    assert mailtm.endpoint_counts == {"/messages": 2, "/token": 1}
+    assert app.get_metrics().counter("tempmail_token_refreshes_total") == refreshes + 1
+
+
+def test_refresh_without_password_reraises(app, mailtm):
+    provider = app.PROVIDERS["Mail.tm"]
+    email, state = provider.generate_email()
+    provider._login(email, state["password"])
+    del state["password"]
+    mailtm.reset_counts()
+
+    with pytest.raises(requests.HTTPError) as e:
+        provider.list_messages(state)
+
+    assert e.value.response.status_code == 401
+    assert mailtm.endpoint_counts == {"/messages": 1}
@@ -0,0 +1,96 @@
+import time
+
+from helpers import failing, stub
+
+
+def make_flaky(app, inner, failures: int):
+    return stub(app.TempMailProvider, name=inner.name, supports_delete=True,
+                list_messages=inner.list_messages,
+                delete_account=failing(failures, inner.delete_account))
+
+
+def tracked_mailbox(app, provider, tmp_path, **kwargs):
+    manager = app.LifecycleManager({provider.name: provider}, grace=0, rate=0, interval=0,
+                                   path=str(tmp_path / "mailboxes.json"), **kwargs)
+    address, state = app.PROVIDERS["Mail.tm"].generate_email()
+    manager.acquire("session-1", provider.name, address, state, created=True)
+    manager.release_session("session-1")
+    return manager, address
+
+
+def test_failed_delete_is_retried(app, mailtm, tmp_path):
+    provider = make_flaky(app, app.PROVIDERS["Mail.tm"], failures=1)
+    manager, address = tracked_mailbox(app, provider, tmp_path)
+
+    assert manager.run_once(time.time() + 1) == 0
+    assert manager.stats["failures"] == 1
+    assert manager.pending() == 1
+    assert address in mailtm.mailboxes
+
+    assert manager.run_once(time.time() + 1) == 1
+    assert manager.stats["accounts_deleted"] == 1
+    assert manager.pending() == 0
+    assert address not in mailtm.mailboxes
+
+
+def test_mailbox_is_abandoned_after_max_attempts(app, mailtm, tmp_path):
+    provider = make_flaky(app, app.PROVIDERS["Mail.tm"], failures=app.CLEANUP_MAX_ATTEMPTS)
+    manager, address = tracked_mailbox(app, provider, tmp_path)
+
+    for _ in range(app.CLEANUP_MAX_ATTEMPTS):
+        assert manager.run_once(time.time() + 1) == 0
+
+    assert manager.stats["abandoned"] == 1
+    assert manager.stats["accounts_deleted"] == 0
+    assert manager.pending() == 0
+    assert address in mailtm.mailboxes
+
+
+def test_tracked_mailboxes_survive_a_restart(app, mailtm, tmp_path):
+    provider = app.PROVIDERS["Mail.tm"]
+    manager, address = tracked_mailbox(app, provider, tmp_path)
+
+    restarted = app.LifecycleManager({provider.name: provider}, grace=0, rate=0, interval=0,
+                                     path=manager.path)
+    assert restarted.pending() == 1
+    assert restarted.run_once(time.time() + 1) == 1
+    assert address not in mailtm.mailboxes
+
+
+def test_shared_mailbox_waits_for_ttl(app, mailtm, tmp_path):
+    provider = app.PROVIDERS["Mail.tm"]
+    manager, address = tracked_mailbox(app, provider, tmp_path, ttl=3600)
+    manager.mark_shared(address)
+
+    assert manager.run_once(time.time() + 1) == 0
+    assert manager.pending() == 1
+    assert manager.run_once(time.time() + 3601) == 1
+
+
+def test_mailbox_in_use_outlives_its_ttl(app, mailtm, tmp_path):
+    provider = app.PROVIDERS["Mail.tm"]
+    manager = app.LifecycleManager({provider.name: provider}, ttl=3600, grace=600, rate=0, interval=0,
+                                   path=str(tmp_path / "mailboxes.json"))
+    address, state = provider.generate_email()
+    manager.acquire("session-1", provider.name, address, state, created=True)
+
+    assert manager.run_once(time.time() + 7200) == 0
+    assert address in mailtm.mailboxes
+
+    manager.release_session("session-1")
+    assert manager.run_once(time.time() + 7200) == 1
+    assert address not in mailtm.mailboxes
+
+
+def test_reclaimed_messages_use_the_total_count(app, mailtm, tmp_path):
+    mailtm.config.inbox_size = 3
+    inner = app.PROVIDERS["Mail.tm"]
+    assert inner.count_messages(inner.generate_email()[1]) == 3
+
+    # More than one /messages page upstream.
+    provider = stub(app.TempMailProvider, name=inner.name, supports_delete=True,
+                    count_messages=lambda state: 45, delete_account=inner.delete_account)
+    manager, address = tracked_mailbox(app, provider, tmp_path)
+
+    assert manager.run_once(time.time() + 1) == 1
+    assert manager.stats["messages_reclaimed"] == 45
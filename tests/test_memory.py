@@ -0,0 +1,81 @@
+import time
+
+
+def session_state(n: int, body_bytes: int = 10_000):
+    ids = [f"m{i}" for i in range(n)]
+    return {
+        "email": "user@bench.test",
+        "cached_messages": [{"id": i, "from": "a@example.com", "subject": "s"} for i in ids],
+        "message_bodies": {i: {"id": i, "textBody": "x" * body_bytes} for i in ids},
+        "unloaded_bodies": set(),
+        "read_messages": set(ids[:1]),
+    }
+
+
+def usage_bytes(app, ss) -> int:
+    return (app.approx_size(ss["message_bodies"]) + app.approx_size(ss["cached_messages"])
+            + app.approx_size(ss["read_messages"]))
+
+
+def test_session_budget_evicts_oldest_bodies_first(app):
+    ss = session_state(5)
+    budget = usage_bytes(app, ss) - 25_000
+    registry = app.MemoryRegistry(budget=10**9, session_budget=budget, idle_seconds=600)
+
+    registry.touch("s1", ss)
+
+    assert list(ss["message_bodies"]) == ["m3", "m4"]
+    assert ss["unloaded_bodies"] == {"m0", "m1", "m2"}
+    assert len(ss["cached_messages"]) == 5
+    assert registry.evicted_bodies == 3
+    assert registry.total_bytes() <= budget
+
+
+def test_global_budget_takes_bodies_from_idle_sessions_first(app):
+    idle, active = session_state(3), session_state(3)
+    budget = usage_bytes(app, idle) + usage_bytes(app, active) - 15_000
+    registry = app.MemoryRegistry(budget=budget, session_budget=10**9, idle_seconds=600)
+
+    registry.touch("idle", idle)
+    time.sleep(0.01)
+    registry.touch("active", active)
+
+    assert list(idle["message_bodies"]) == ["m2"]
+    assert idle["unloaded_bodies"] == {"m0", "m1"}
+    assert len(active["message_bodies"]) == 3
+    assert registry.evicted_summaries == 0
+
+
+def test_idle_summaries_go_only_after_all_bodies(app):
+    idle, active = session_state(3), session_state(3)
+    # Room for one session's summaries only.
+    budget = usage_bytes(app, active) - app.approx_size(active["message_bodies"]) + 1000
+    registry = app.MemoryRegistry(budget=budget, session_budget=10**9, idle_seconds=0.05)
+
+    registry.touch("idle", idle)
+    time.sleep(0.1)
+    registry.touch("active", active)
+
+    assert idle["message_bodies"] == {} and idle["cached_messages"] == []
+    assert idle["unloaded_bodies"] == {"m0", "m1", "m2"}
+    # The running session loses bodies before any summaries but keeps its own.
+    assert active["message_bodies"] == {}
+    assert len(active["cached_messages"]) == 3
+    assert registry.evicted_summaries == 3
+
+
+def test_finished_background_results_count_and_go_with_idle_summaries(app):
+    done, running = app.Future(), app.Future()
+    done.set_result({"id": "m9", "textBody": "x" * 50_000})
+    ss = dict(session_state(1), pending_fetches={("read", "a", "m9"): done, ("read", "a", "m8"): running})
+    registry = app.MemoryRegistry(budget=10**9, session_budget=10**9, idle_seconds=0)
+
+    registry.touch("idle", ss)
+    assert registry.total_bytes() >= usage_bytes(app, ss) + 50_000
+
+    registry.budget = 1
+    time.sleep(0.01)
+    registry.touch("active", session_state(0))
+
+    assert registry.total_bytes() < 50_000
+    assert ss["pending_fetches"] == {("read", "a", "m8"): running}
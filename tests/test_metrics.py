@@ -0,0 +1,50 @@
+def test_render_prometheus_counters_and_histograms(app):
+    metrics = app.Metrics()
+    metrics.inc("tempmail_provider_requests_total", provider="Mail.tm", endpoint="/messages", status="200")
+    metrics.inc("tempmail_provider_requests_total", 2, provider="Mail.tm", endpoint="/messages", status="200")
+    metrics.inc("tempmail_provider_requests_total", provider='say "hi"', endpoint="/x", status="500")
+    metrics.observe("tempmail_rerun_seconds", 0.07, phase="total")
+    metrics.observe("tempmail_rerun_seconds", 3.0, phase="total")
+
+    lines = metrics.render_prometheus().splitlines()
+
+    assert lines[:3] == [
+        "# TYPE tempmail_provider_requests_total counter",
+        'tempmail_provider_requests_total{endpoint="/messages",provider="Mail.tm",status="200"} 3',
+        "tempmail_provider_requests_total{endpoint=\"/x\",provider=\"say 'hi'\",status=\"500\"} 1",
+    ]
+    assert lines[3] == "# TYPE tempmail_rerun_seconds histogram"
+    # Buckets are cumulative and end with +Inf, followed by sum and count.
+    buckets = [line for line in lines if line.startswith("tempmail_rerun_seconds_bucket")]
+    assert buckets == [
+        'tempmail_rerun_seconds_bucket{phase="total",le="0.05"} 0',
+        'tempmail_rerun_seconds_bucket{phase="total",le="0.1"} 1',
+        'tempmail_rerun_seconds_bucket{phase="total",le="0.25"} 1',
+        'tempmail_rerun_seconds_bucket{phase="total",le="0.5"} 1',
+        'tempmail_rerun_seconds_bucket{phase="total",le="1"} 1',
+        'tempmail_rerun_seconds_bucket{phase="total",le="2.5"} 1',
+        'tempmail_rerun_seconds_bucket{phase="total",le="5"} 2',
+        'tempmail_rerun_seconds_bucket{phase="total",le="10"} 2',
+        'tempmail_rerun_seconds_bucket{phase="total",le="15"} 2',
+        'tempmail_rerun_seconds_bucket{phase="total",le="+Inf"} 2',
+    ]
+    assert lines[-2:] == [
+        'tempmail_rerun_seconds_sum{phase="total"} 3.070000',
+        'tempmail_rerun_seconds_count{phase="total"} 2',
+    ]
+
+
+def test_render_prometheus_empty(app):
+    assert app.Metrics().render_prometheus() == "\n"
+
+
+def test_counter_sums_over_unmatched_labels(app):
+    metrics = app.Metrics()
+    metrics.inc("tempmail_cache_requests_total", cache="inbox", result="hit")
+    metrics.inc("tempmail_cache_requests_total", cache="inbox", result="miss")
+    metrics.inc("tempmail_cache_requests_total", cache="body", result="hit")
+
+    assert metrics.counter("tempmail_cache_requests_total") == 3
+    assert metrics.counter("tempmail_cache_requests_total", cache="inbox") == 2
+    assert metrics.cache_hit_rate("inbox") == 0.5
+    assert metrics.cache_hit_rate("missing") is None
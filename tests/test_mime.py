@@ -0,0 +1,66 @@
+from email.message import EmailMessage
+
+
+def sample_source() -> bytes:
+    msg = EmailMessage()
+    msg["Received"] = "from client.example.com by mx1.example.com"
+    msg["From"] = "sender@example.com"
+    msg["Subject"] = "Café résumé ✓"
+    msg.set_content("héllo", charset="iso-8859-1")
+    msg.add_alternative("<p>hi</p>", subtype="html")
+    msg.add_attachment(b"\x00\x01binary" * 100, maintype="application", subtype="octet-stream",
+                       filename="blob.bin")
+    # Prepended as-is so the first hop stays folded over two lines.
+    folded = b"Received: from mx1.example.com\n by in.bench.test; Mon, 1 Jan 2024 00:00:00 +0000\n"
+    return folded + msg.as_bytes()
+
+
+def test_headers_are_decoded_on_access(app):
+    raw = sample_source()
+    assert b"=?utf-8?" in raw
+
+    src = app.LazyMimeMessage.from_bytes(raw)
+
+    assert src.raw_size == len(raw)
+    assert src.header("Subject") == "Café résumé ✓"
+    # Folded values are unfolded; repeated headers keep their order.
+    assert src.headers("received") == [
+        "from mx1.example.com by in.bench.test; Mon, 1 Jan 2024 00:00:00 +0000",
+        "from client.example.com by mx1.example.com",
+    ]
+    assert src.header_names().count("Received") == 1
+    assert src.header("X-Missing") == ""
+
+
+def test_parts_are_decoded_lazily(app):
+    raw = sample_source()
+    src = app.LazyMimeMessage.from_chunks(raw[i:i + 100] for i in range(0, len(raw), 100))
+
+    parts = src.parts()
+    assert [p.content_type for p in parts] == ["text/plain", "text/html", "application/octet-stream"]
+    assert [p.is_attachment for p in parts] == [False, False, True]
+    assert parts[2].filename == "blob.bin"
+    assert all(p._content is None for p in parts)
+
+    before = src.__sizeof__()
+    assert parts[2].content() == b"\x00\x01binary" * 100
+    assert src.__sizeof__() == before + 800
+    assert parts[0].text() == "héllo\n"
+
+
+def test_unknown_charset_falls_back_to_utf8(app):
+    raw = b"Content-Type: text/plain; charset=x-nonexistent\n\nplain \xc3\xa9\n"
+    part = app.LazyMimeMessage.from_bytes(raw).parts()[0]
+    assert part.text() == "plain é\n"
+
+
+def test_reconstructed_1secmail_source_has_a_date(app, mailtm):
+    mailtm.config.inbox_size = 1
+    provider = app.PROVIDERS["1secmail"]
+    _, state = provider.generate_email()
+    msg_id = provider.list_messages(state)[0]["id"]
+
+    src = provider.read_source(state, msg_id)
+
+    assert src.header("Date") == "Mon, 01 Jan 2024 00:00:00 +0000"
+    assert src.header("X-Tempmail-Reconstructed") == "1secmail"